@@ -13,59 +13,308 @@ xxxx7x5xx
 xxxxxxxxx
 Где неизвестные значения могут являться любым символом, кроме цифры.
 Для вычисления, используется метод calculate_result без аргументов.
+По умолчанию вычисление выполняет исходное ядро на множествах, аргумент engine='bitmask' переключает
+его на ядро BitBoard, которое хранит возможные значения клеток в виде битовых масок.
+
+Судоку также можно создать из строки из 81 символа (Sudoku.from_string) или из 9 строк
+(Sudoku.from_rows), а поток таких строк решить генератором solve_stream.
+Поля 16×16 и 25×25 (строки из 256 и 625 символов, значения - цифры и латинские буквы)
+решают ядра bitmask и dlx, таблицы поля любого размера содержит класс Geometry.
+Пакетный режим: python -m sudoku puzzles.txt (или '-' для стандартного ввода)
+выводит решение каждого судоку файла отдельной строкой. Функция solve_parallel и
+аргумент --workers распределяют пакет по нескольким процессам.
 """
 
+import argparse
+import multiprocessing
+import os
+import sys
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, TimeoutError, wait
+from functools import partial
+from itertools import combinations, islice
+from math import log2
 from time import perf_counter
 
 
+class _MaskTable(dict):
+    """
+    Таблица значений функции маски, вычисляемых при первом обращении: для масок больше 16 бит полные
+    таблицы слишком велики. Повторное обращение к маске - поиск в словаре без вызова функции.
+    """
+
+    __slots__ = ('function',)
+
+    def __init__(self, function):
+        super().__init__()
+        self.function = function
+
+    def __missing__(self, mask):
+        value = self[mask] = self.function(mask)
+        return value
+
+
+class _BitCount:
+    """ Таблица количества возможных значений в маске без хранения: обращение вызывает int.bit_count. """
+
+    __slots__ = ()
+    __getitem__ = staticmethod(int.bit_count)
+
+
+class Geometry:
+    """
+    Статические таблицы поля судоку с малыми квадратами box×box: поле size×size, size = box².
+    Клетки нумеруются по строкам от 0, столбцы, строки и малые квадраты - от 0 до size - 1.
+    Бит (d - 1) маски соответствует значению d, значения записываются символами алфавита alphabet.
+    """
+
+    ALPHABET = '123456789ABCDEFGHIJKLMNOP'
+    COLUMN_LETTERS = 'abcdefghijklmnopqrstuvwxy'
+    BOXES = (3, 4, 5)
+    _instances = {}
+
+    @classmethod
+    def get(cls, box):
+        """ Таблицы поля с малыми квадратами box×box (создаются один раз). """
+
+        try:
+            return cls._instances[box]
+        except KeyError:
+            if box not in cls.BOXES:
+                raise ValueError(f'неподдерживаемый размер малого квадрата: {box}') from None
+            geometry = cls._instances[box] = cls(box)
+            return geometry
+
+    @classmethod
+    def from_length(cls, length):
+        """ Таблицы поля из length клеток. """
+
+        for box in cls.BOXES:
+            if box ** 4 == length:
+                return cls.get(box)
+        raise ValueError('в судоку должно быть 81, 256 или 625 значений')
+
+    def __init__(self, box):
+        size = box * box
+        cells = range(size * size)
+        self.box = box
+        self.size = size
+        self.cells = size * size
+        self.alphabet = self.ALPHABET[:size]
+        self.column_letters = self.COLUMN_LETTERS[:size]
+        # Номер значения каждого символа алфавита
+        self.digits = {symbol: number for number, symbol in enumerate(self.alphabet, 1)}
+
+        # Маска всех значений - все возможные значения клетки
+        self.all_options = (1 << size) - 1
+        lowest_bit = lambda mask: (mask & -mask).bit_length()
+        mask_digits = lambda mask: tuple(d for d in range(1, size + 1) if mask >> (d - 1) & 1)
+        if size <= 16:
+            # Количество возможных значений в маске и значение младшего бита маски (0 для пустой маски)
+            self.popcount = tuple(map(int.bit_count, range(self.all_options + 1)))
+            self.lowest_bit = tuple(map(lowest_bit, range(self.all_options + 1)))
+        else:
+            self.popcount = _BitCount()
+            self.lowest_bit = _MaskTable(lowest_bit)
+        # Все значения маски в порядке возрастания
+        self.mask_digits = tuple(map(mask_digits, range(self.all_options + 1))) if size <= 9 else _MaskTable(mask_digits)
+
+        # Номера столбца, строки и малого квадрата каждой клетки
+        self.cell_column = tuple(cell % size for cell in cells)
+        self.cell_line = tuple(cell // size for cell in cells)
+        self.cell_square = tuple(cell // (size * box) * box + cell % size // box for cell in cells)
+        # Клетки каждого столбца, строки и малого квадрата
+        self.columns = tuple(tuple(cell for cell in cells if self.cell_column[cell] == x) for x in range(size))
+        self.lines = tuple(tuple(cell for cell in cells if self.cell_line[cell] == y) for y in range(size))
+        self.squares = tuple(tuple(cell for cell in cells if self.cell_square[cell] == number) for number in range(size))
+        # Все группы в том порядке, в котором их перебирают алгоритмы: столбцы, строки, малые квадраты
+        self.units = units = self.columns + self.lines + self.squares
+        # Номера групп каждой клетки в units
+        self.cell_units = tuple((self.cell_column[cell], size + self.cell_line[cell], 2 * size + self.cell_square[cell])
+                                for cell in cells)
+        # Клетки, находящиеся в одном столбце, строке или малом квадрате с клеткой
+        self.peers = tuple(tuple(sorted(set(units[unit][i] for unit in self.cell_units[cell] for i in range(size))
+                                        - {cell}))
+                           for cell in cells)
+        # Пересечения групп: для каждой группы - разбиения ее клеток на пересечения с группами другого вида
+        # (малого квадрата - со строками и со столбцами, строки и столбца - с малыми квадратами),
+        # каждое пересечение задано своими клетками и остальными клетками пересекающей группы
+        unit_sets = [set(unit) for unit in units]
+        self.unit_segments = tuple(
+            tuple(tuple((tuple(cell for cell in units[unit] if cell in unit_sets[other]),
+                         tuple(cell for cell in units[other] if cell not in unit_sets[unit]))
+                        for other in others if unit_sets[unit] & unit_sets[other])
+                  for others in ((range(size, 2 * size), range(size)) if unit >= 2 * size else
+                                 (range(2 * size, 3 * size),)))
+            for unit in range(3 * size))
+
+    def cell_name(self, cell):
+        """ Обозначение клетки: буква столбца и номер строки. """
+
+        return f'{self.column_letters[self.cell_column[cell]]}{self.cell_line[cell] + 1}'
+
+
+# Таблицы поля 9×9, которые используются по умолчанию
+GEOMETRY = Geometry.get(3)
+ALL_OPTIONS = GEOMETRY.all_options
+POPCOUNT = GEOMETRY.popcount
+LOWEST_BIT = GEOMETRY.lowest_bit
+MASK_DIGITS = GEOMETRY.mask_digits
+CELL_COLUMN = GEOMETRY.cell_column
+CELL_LINE = GEOMETRY.cell_line
+CELL_SQUARE = GEOMETRY.cell_square
+COLUMNS = GEOMETRY.columns
+LINES = GEOMETRY.lines
+SQUARES = GEOMETRY.squares
+UNITS = GEOMETRY.units
+CELL_UNITS = GEOMETRY.cell_units
+PEERS = GEOMETRY.peers
+UNIT_SEGMENTS = GEOMETRY.unit_segments
+# Полосы из трех малых квадратов и трех строк (столбцов), которые их связывают:
+# BANDS[полоса][квадрат][строка] - клетки пересечения квадрата полосы со строкой (столбцом) полосы
+BANDS = tuple(tuple(tuple(tuple(cell for cell in SQUARES[square] if cell in group) for group in groups)
+                    for square in squares)
+              for band in range(3)
+              for groups, squares in ((LINES[band * 3:band * 3 + 3], range(band * 3, band * 3 + 3)),
+                                      (COLUMNS[band * 3:band * 3 + 3], range(band, 9, 3))))
+
+
 class Sudoku:
     """
     Класс, использующий несколько алгоритмов поиска неизвестных значений и решающий судоку любой сложности.
     При создании нового экземпляра класса, на вход принимаются 9 строк, содержащие 9 значений.
+    Если строки не переданы, они считываются со стандартного ввода.
+
+    Аргумент box - размер малого квадрата: 3 для поля 9×9, 4 для поля 16×16 и 5 для поля 25×25.
+    Значения полей больше 9×9 записываются цифрами и латинскими буквами (Geometry.alphabet),
+    их решают только ядра 'bitmask' и 'dlx'.
     """
 
     COLUMN_LETTERS = 'abcdefghi'
     LINE_NUMBERS = '123456789'
-
-    def __init__(self):
-        self.empty_cells = [0] * 81
-        self.cells = {f'{x}{y}': self.Cell(x, y, value)
-                      for y in Sudoku.LINE_NUMBERS
-                      for x, value in zip(Sudoku.COLUMN_LETTERS, self._validate_line(list(input())))}
-        self.columns = {f'{x}': self.Column(x) for x in Sudoku.COLUMN_LETTERS}
-        self.lines = {f'{y}': self.Line(y) for y in Sudoku.LINE_NUMBERS}
-        self.small_squares = {number: self.SmallSquare(number) for number in range(1, 10)}
+    ENGINES = ('sets', 'bitmask', 'dlx')
+
+    def __init__(self, rows=None, box=3):
+        self.geometry = geometry = Geometry.get(box)
+        size = geometry.size
+        if rows is None:
+            rows = (input() for _ in range(size))
+        self.empty_cells = [0] * geometry.cells
+        values = [value for row in rows for value in self._validate_line(list(row), geometry)]
+        if len(values) != geometry.cells:
+            raise ValueError(f'в судоку должно быть {size} строк')
+        self.cells = [self.Cell(index, value, geometry) for index, value in enumerate(values)]
+        self.columns = [self.Column(x) for x in range(size)]
+        self.lines = [self.Line(y) for y in range(size)]
+        self.small_squares = [self.SmallSquare(number) for number in range(size)]
+        # Количество испробованных при подборе вариантов значений и статистика вычисления (SolveStats)
+        self.nodes = 0
+        self.stats = None
+        # Ядро BitBoard, которое создается при первом вычислении и используется повторно
+        self.board = None
 
     def __str__(self):
+        size, box = self.geometry.size, self.geometry.box
         result = []
-        count = 0
-        for i, j in self.cells.items():
-            count += 1
-            if not count % 9:
-                if count == 27 or count == 54:
-                    result.append(f'{self.cells[i].value}\n\n')
+        for count, cell in enumerate(self.cells, 1):
+            if not count % size:
+                if not count % (size * box) and count != len(self.cells):
+                    result.append(f'{cell.value}\n\n')
                 else:
-                    result.append(f'{self.cells[i].value}\n')
-            elif not count % 3 or not count % 6:
-                result.append(f'{self.cells[i].value}    ')
+                    result.append(f'{cell.value}\n')
+            elif not count % box:
+                result.append(f'{cell.value}    ')
             else:
-                result.append(f'{self.cells[i].value}  ')
+                result.append(f'{cell.value}  ')
         return ''.join(result)
 
+    @classmethod
+    def from_rows(cls, rows, box=3):
+        """ Создание судоку из 9 строк, содержащих 9 значений (для поля box² × box² - из box² строк). """
+
+        return cls(list(rows), box)
+
+    @classmethod
+    def from_string(cls, line):
+        """
+        Создание судоку из строки из 81 символа, записанной по строкам поля.
+        Неизвестные значения обозначаются нулем или любым другим символом, кроме цифры.
+        Строка из 256 или 625 символов задает поле 16×16 или 25×25, в котором неизвестные значения
+        обозначаются нулем или любым символом, кроме цифры и латинской буквы.
+        """
+
+        line = line.strip()
+        geometry = Geometry.from_length(len(line))
+        line = line.replace('0', '.')
+        size = geometry.size
+        return cls([line[i:i + size] for i in range(0, geometry.cells, size)], geometry.box)
+
+    def reset(self, puzzle):
+        """
+        Загрузка нового судоку, записанного строкой (как в from_string), в уже созданные клетки и группы.
+        Ядро BitBoard прошлых вычислений также используется повторно. Если размер поля другой, клетки
+        и группы создаются заново. При ошибке в записи значения клеток не изменяются. Возвращает само судоку.
+        """
+
+        line = puzzle.strip()
+        geometry = Geometry.from_length(len(line))
+        line = line.replace('0', '.')
+        size = geometry.size
+        rows = [self._validate_line(line[i:i + size], geometry) for i in range(0, geometry.cells, size)]
+        if geometry is not self.geometry:
+            self.__init__(rows, geometry.box)
+            return self
+        alphabet, cells = geometry.alphabet, self.cells
+        index = 0
+        for row in rows:
+            for value in row:
+                cell = cells[index]
+                cell.value = value
+                cell.value_options.clear()
+                if value not in alphabet:
+                    cell.value_options.update(alphabet)
+                index += 1
+        for group in (*self.columns, *self.lines, *self.small_squares):
+            group.values.clear()
+            group.cells.clear()
+        self.empty_cells = [0] * geometry.cells
+        self.nodes = 0
+        self.stats = None
+        return self
+
+    def _get_board(self, values):
+        """ Ядро BitBoard со значениями values: ранее созданное ядро загружается заново методом reset. """
+
+        if self.board is None or self.board.geometry is not self.geometry:
+            self.board = BitBoard(values, self.geometry)
+            return self.board
+        return self.board.reset(values)
+
+    def to_string(self):
+        """ Запись судоку в строку из 81 символа, неизвестные значения обозначаются точкой. """
+
+        alphabet = self.geometry.alphabet
+        return ''.join(cell.value if cell.value in alphabet else '.' for cell in self.cells)
+
     class Cell:
         """
-        Класс клетки, создержащий ее координаты, значение и возможные значения этой клетки.
+        Класс клетки, создержащий ее номер, координаты, значение и возможные значения этой клетки.
         Реализует метод копирования и метод вычисления возможных значений.
         """
 
-        def __init__(self, x, y, value):
-            self.x = x
-            self.y = y
+        __slots__ = ('index', 'geometry', 'x', 'y', 'value', 'value_options')
+
+        def __init__(self, index, value, geometry=GEOMETRY):
+            self.index = index
+            self.geometry = geometry
+            self.x = geometry.column_letters[geometry.cell_column[index]]
+            self.y = str(geometry.cell_line[index] + 1)
             self.value = value
-            self.value_options = set() if self.value.isdigit() else {str(i) for i in range(1, 10)}
+            self.value_options = set() if self.value in geometry.alphabet else set(geometry.alphabet)
 
         def copy(self):
-            cell = Sudoku.Cell(self.x, self.y, self.value)
+            cell = Sudoku.Cell(self.index, self.value, self.geometry)
             cell.value_options = self.value_options.copy()
             return cell
 
@@ -90,6 +339,8 @@ class Sudoku:
         Реализует метод собственного копирования.
         """
 
+        __slots__ = ('x', 'values', 'cells')
+
         def __init__(self, x):
             self.x = x
             self.values = set()
@@ -98,9 +349,7 @@ class Sudoku:
         def copy(self, cells):
             column = Sudoku.Column(self.x)
             column.values = self.values.copy()
-            column.cells = [cells[key] for key in cells
-                            for cell_2 in self.cells
-                            if f'{cells[key].x}{cells[key].y}' == f'{cell_2.x}{cell_2.y}']
+            column.cells = [cells[index] for index in COLUMNS[self.x]]
             return column
 
     class Line:
@@ -109,6 +358,8 @@ class Sudoku:
         Реализует метод собственного копирования.
         """
 
+        __slots__ = ('y', 'values', 'cells')
+
         def __init__(self, y):
             self.y = y
             self.values = set()
@@ -117,91 +368,51 @@ class Sudoku:
         def copy(self, cells):
             line = Sudoku.Line(self.y)
             line.values = self.values.copy()
-            line.cells = [cells[key] for key in cells
-                          for cell_2 in self.cells
-                          if f'{cells[key].x}{cells[key].y}' == f'{cell_2.x}{cell_2.y}']
+            line.cells = [cells[index] for index in LINES[self.y]]
             return line
 
     class SmallSquare:
         """
-        Класс, содержащий все клетки одного малого квадрата, все координаты
-        его строк и столбцов, а также известные значения.
+        Класс, содержащий все клетки одного малого квадрата, а также известные значения.
         Реализует метод собственного копирования.
         """
 
+        __slots__ = ('number', 'values', 'cells')
+
         def __init__(self, number):
             self.number = number
             self.values = set()
             self.cells = []
-            self.columns = self._definition_cl('columns')
-            self.lines = self._definition_cl('lines')
 
         def copy(self, cells):
             small_square = Sudoku.SmallSquare(self.number)
             small_square.values = self.values.copy()
-            small_square.cells = [cells[key] for key in cells
-                                  for cell_2 in self.cells
-                                  if f'{cells[key].x}{cells[key].y}' == f'{cell_2.x}{cell_2.y}']
-            small_square.columns = self.columns.copy()
-            small_square.lines = self.lines.copy()
+            small_square.cells = [cells[index] for index in SQUARES[self.number]]
             return small_square
 
-        def _definition_cl(self, param):
-            """ Вычесление координат срок и столбцов квадрата. """
-
-            result = {'columns': [], 'lines': []}
-            if self.number in [1, 4, 7]:
-                result['columns'].extend(['a', 'b', 'c'])
-            elif self.number in [2, 5, 8]:
-                result['columns'].extend(['d', 'e', 'f'])
-            elif self.number in [3, 6, 9]:
-                result['columns'].extend(['g', 'h', 'i'])
-
-            if self.number in [1, 2, 3]:
-                result['lines'].extend(['1', '2', '3'])
-            elif self.number in [4, 5, 6]:
-                result['lines'].extend(['4', '5', '6'])
-            elif self.number in [7, 8, 9]:
-                result['lines'].extend(['7', '8', '9'])
-
-            if param == 'columns':
-                return result['columns']
-            elif param == 'lines':
-                return result['lines']
-
     @staticmethod
-    def _validate_line(line):
+    def _validate_line(line, geometry=GEOMETRY):
         """ Проверка корректности введенных данных для строк. """
 
-        if len(line) != 9:
-            raise ValueError('в строке должно быть 9 значений')
+        if len(line) != geometry.size:
+            raise ValueError(f'в строке должно быть {geometry.size} значений')
+        if geometry.size > 9:
+            # Буквы значений полей больше 9×9 можно вводить в любом регистре
+            line = [i.upper() for i in line]
+            for i in line:
+                if i.isascii() and i.isalnum() and i not in geometry.alphabet and i != '0':
+                    raise ValueError(f'значение клетки должно быть в диапазоне от 1 до {geometry.alphabet[-1]}')
+            return line
         for i in line:
             if i.isdigit() and i not in '123456789':
                 raise ValueError('значение клетки должно быть в диапазоне от 1 до 9')
         return line
 
-    @staticmethod
-    def _switch_squares(cell_key):
-        """ Определение номера малого квадрата по координатам клетки. """
-
-        if cell_key[0] in 'abc' and cell_key[1] in '123':
-            return 1
-        elif cell_key[0] in 'def' and cell_key[1] in '123':
-            return 2
-        elif cell_key[0] in 'ghi' and cell_key[1] in '123':
-            return 3
-        elif cell_key[0] in 'abc' and cell_key[1] in '456':
-            return 4
-        elif cell_key[0] in 'def' and cell_key[1] in '456':
-            return 5
-        elif cell_key[0] in 'ghi' and cell_key[1] in '456':
-            return 6
-        elif cell_key[0] in 'abc' and cell_key[1] in '789':
-            return 7
-        elif cell_key[0] in 'def' and cell_key[1] in '789':
-            return 8
-        elif cell_key[0] in 'ghi' and cell_key[1] in '789':
-            return 9
+    def _get_groups(self, cell):
+        """ Возвращает столбец, строку и малый квадрат, в которых находится клетка. """
+
+        index = cell.index
+        return self.columns[CELL_COLUMN[index]], self.lines[CELL_LINE[index]], self.small_squares[CELL_SQUARE[index]]
 
     def _definition_data(self):
         """
@@ -209,17 +420,18 @@ class Sudoku:
         результата для всех столбцов, строк и квадратов.
         """
 
-        for cell_key in self.cells:
-            cell = self.cells[cell_key]
+        for cell in self.cells:
             cell_value = cell.value
-            self.columns[cell_key[0]].cells.append(cell)
-            self.lines[cell_key[1]].cells.append(cell)
-            switch_squares_cell = self._switch_squares(cell_key)
-            self.small_squares[switch_squares_cell].cells.append(cell)
+            column, line, small_square = self._get_groups(cell)
+            column.cells.append(cell)
+            line.cells.append(cell)
+            small_square.cells.append(cell)
             if cell_value.isdigit():
-                self.columns[cell_key[0]].values |= {cell_value}
-                self.lines[cell_key[1]].values |= {cell_value}
-                self.small_squares[switch_squares_cell].values |= {cell_value}
+                if cell_value in (column.values | line.values | small_square.values):
+                    raise ValueError(f'невозможное значение клетки {cell.x}{cell.y}: {cell_value}')
+                column.values |= {cell_value}
+                line.values |= {cell_value}
+                small_square.values |= {cell_value}
                 self.empty_cells.pop()
 
     @staticmethod
@@ -257,23 +469,22 @@ class Sudoku:
         return max_value
 
     @staticmethod
-    def _find_common_values(square, group1, group2, group3):
+    def _find_common_values(segment_1, segment_2, segment_3):
         """
         Поиск общих значений малого квадрата, которые есть в двух первых группах
-        (строках или столбцах малого квадрата), но нет в третьей.
+        (пересечениях малого квадрата со строками или столбцами), но нет в третьей.
         """
 
         set1, set2, set3 = set(), set(), set()
-        for cell in square.cells:
-            if group1 in [cell.x, cell.y] and cell.value_options:
-                set1 |= cell.value_options
-            if group2 in [cell.x, cell.y] and cell.value_options:
-                set2 |= cell.value_options
-            if group3 in [cell.x, cell.y]:
-                if cell.value_options:
-                    set3 |= cell.value_options
-                else:
-                    set3.add(cell.value)
+        for cell in segment_1:
+            set1 |= cell.value_options
+        for cell in segment_2:
+            set2 |= cell.value_options
+        for cell in segment_3:
+            if cell.value_options:
+                set3 |= cell.value_options
+            else:
+                set3.add(cell.value)
         return (set1 & set2) - set3
 
     def _optimization_value_options(self):
@@ -284,9 +495,9 @@ class Sudoku:
 
         # Проверяем каждый столбец, строку и квадрат
         for data in [self.columns, self.lines, self.small_squares]:
-            for key in data:
+            for group in data:
                 # Находим все клетки с неизвестым значением
-                unknown_cells = self._get_unknown_cells(data[key])
+                unknown_cells = self._get_unknown_cells(group)
                 # На основе этих данных проходим по всем возможным группам возможных значений,
                 # основываясь на размере групп
                 for group_len in range(2, len(unknown_cells)):
@@ -311,11 +522,8 @@ class Sudoku:
                                         # Если оставщееся количество возможных значений равно единице,
                                         # значит оно равно значинию клетки
                                         if len(cell.value_options) == 1:
-                                            column = self.columns[cell.x]
-                                            line = self.lines[cell.y]
-                                            small_square = self.small_squares[self._switch_squares(f'{cell.x}{cell.y}')]
                                             cell.value = cell.value_options.pop()
-                                            self._update_data(cell, column, line, small_square, self.empty_cells)
+                                            self._update_data(cell, *self._get_groups(cell), self.empty_cells)
 
     def _search_unique_value(self):
         """
@@ -326,9 +534,9 @@ class Sudoku:
         """
 
         for data in [self.columns, self.lines, self.small_squares]:
-            for key in data:
+            for group in data:
                 data_groups = {}
-                unknown_cells = self._get_unknown_cells(data[key])
+                unknown_cells = self._get_unknown_cells(group)
                 for cell in unknown_cells:
                     for option in cell.value_options:
                         try:
@@ -340,10 +548,7 @@ class Sudoku:
                         cell = data_groups[option][1]
                         cell.value = option
                         cell.value_options = set()
-                        column = self.columns[cell.x]
-                        line = self.lines[cell.y]
-                        small_square = self.small_squares[self._switch_squares(f'{cell.x}{cell.y}')]
-                        self._update_data(cell, column, line, small_square, self.empty_cells)
+                        self._update_data(cell, *self._get_groups(cell), self.empty_cells)
                         return
 
     def _search_intersection(self):
@@ -358,77 +563,27 @@ class Sudoku:
         значения быть не может.
         """
 
-        lines_key = {1: [0, 1, 2], 2: [0, 2, 1], 3: [1, 2, 0]}
-        result = None
-        for count in range(1, 10):
-            if not (count - 1) % 3:
-                # Рассматриваем пары квдратов: 1, 2 и 1, 3 и 2, 3
-                for i in range(1, 4):
-                    if i == 1:
-                        small_square_1 = self.small_squares[count]
-                        small_square_2 = self.small_squares[count+1]
-                        small_square_3 = self.small_squares[count+2]
-                    elif i == 2:
-                        small_square_1 = self.small_squares[count]
-                        small_square_2 = self.small_squares[count+2]
-                        small_square_3 = self.small_squares[count+1]
-                    else:
-                        small_square_1 = self.small_squares[count+1]
-                        small_square_2 = self.small_squares[count+2]
-                        small_square_3 = self.small_squares[count]
-
-                    for k in range(1, 4):
-                        # Достаем все номера сток из первого квадрата
-                        line1 = small_square_1.lines[lines_key[k][0]]
-                        line2 = small_square_1.lines[lines_key[k][1]]
-                        line3 = small_square_1.lines[lines_key[k][2]]
-                        # Вычисляем общие значения строк двух первых квадратов
-                        values_1 = self._find_common_values(small_square_1, line1, line2, line3)
-                        values_2 = self._find_common_values(small_square_2, line1, line2, line3)
-                        common_values = values_1 & values_2
-                        if common_values:
-                            for cell in small_square_3.cells:
-                                if cell.y in [line1, line2] and cell.value_options:
-                                    cell_value_options = cell.value_options.copy()
-                                    cell.value_options -= common_values
-                                    if cell_value_options != cell.value_options:
-                                        result = 1
-                            if result:
-                                return result
-
-            if count in [1, 2, 3]:
-                for i in range(1, 4):
-                    if i == 1:
-                        small_square_1 = self.small_squares[count]
-                        small_square_2 = self.small_squares[count+3]
-                        small_square_3 = self.small_squares[count+6]
-                    elif i == 2:
-                        small_square_1 = self.small_squares[count]
-                        small_square_2 = self.small_squares[count+6]
-                        small_square_3 = self.small_squares[count+3]
-                    else:
-                        small_square_1 = self.small_squares[count+3]
-                        small_square_2 = self.small_squares[count+6]
-                        small_square_3 = self.small_squares[count]
-
-                    for k in range(1, 4):
-                        # Достаем все номера столбцов из первого квадрата
-                        column1 = small_square_1.columns[lines_key[k][0]]
-                        column2 = small_square_1.columns[lines_key[k][1]]
-                        column3 = small_square_1.columns[lines_key[k][2]]
-                        # Вычисляем общие значения столбцов двух первых квадратов
-                        values_1 = self._find_common_values(small_square_1, column1, column2, column3)
-                        values_2 = self._find_common_values(small_square_2, column1, column2, column3)
-                        common_values = values_1 & values_2
-                        if common_values:
-                            for cell in small_square_3.cells:
-                                if cell.x in [column1, column2] and cell.value_options:
-                                    cell_value_options = cell.value_options.copy()
+        cells = self.cells
+        for band in BANDS:
+            # Рассматриваем пары квадратов полосы: 1, 2 и 1, 3 и 2, 3
+            for square_1, square_2, square_3 in ((0, 1, 2), (0, 2, 1), (1, 2, 0)):
+                for line_1, line_2, line_3 in ((0, 1, 2), (0, 2, 1), (1, 2, 0)):
+                    # Вычисляем общие значения строк (столбцов) двух первых квадратов
+                    values_1, values_2 = (
+                        self._find_common_values(*([cells[index] for index in band[square][line]]
+                                                   for line in (line_1, line_2, line_3)))
+                        for square in (square_1, square_2))
+                    common_values = values_1 & values_2
+                    if common_values:
+                        result = None
+                        for line in (line_1, line_2):
+                            for index in band[square_3][line]:
+                                cell = cells[index]
+                                if cell.value_options & common_values:
                                     cell.value_options -= common_values
-                                    if cell_value_options != cell.value_options:
-                                        result = 1
-                            if result:
-                                return result
+                                    result = 1
+                        if result:
+                            return result
 
     def _calculate_unknown_cells(self):
         """
@@ -454,11 +609,8 @@ class Sudoku:
 
             empty_cells_check = len(self.empty_cells)
 
-            for key, cell in self.cells.items():
-                columns = self.columns[key[0]]
-                lines = self.lines[key[1]]
-                small_squares = self.small_squares[self._switch_squares(key)]
-                cell.update_value_options(columns, lines, small_squares, self.empty_cells)
+            for cell in self.cells:
+                cell.update_value_options(*self._get_groups(cell), self.empty_cells)
 
             self._optimization_value_options()
 
@@ -469,13 +621,12 @@ class Sudoku:
 
         backup = {
             'empty_cells': self.empty_cells.copy(),
-            'cells': {key: cell.copy() for key, cell in self.cells.items()}
+            'cells': [cell.copy() for cell in self.cells]
         }
         # В столбцы, строки и квадраты добавляются копии клеток, которые уже есть в бэкапе
-        backup.update({'columns': {key: column.copy(backup['cells']) for key, column in self.columns.items()},
-                       'lines': {key: line.copy(backup['cells']) for key, line in self.lines.items()},
-                       'small_square': {key: small_square.copy(backup['cells'])
-                                        for key, small_square in self.small_squares.items()}})
+        backup.update({'columns': [column.copy(backup['cells']) for column in self.columns],
+                       'lines': [line.copy(backup['cells']) for line in self.lines],
+                       'small_square': [small_square.copy(backup['cells']) for small_square in self.small_squares]})
         return backup
 
     def _calculate_cell_variant(self, cell, backup, choice_value=0, cell_value_options=None, result=None):
@@ -498,12 +649,10 @@ class Sudoku:
                     backup = self._get_backup()
                     result = {'backup': backup}
                 # Пытаемся угадать значение клетки из возможных вариантов
+                self.nodes += 1
                 cell.value = cell_value_options[choice_value]
                 cell.value_options = set()
-                column = self.columns[cell.x]
-                line = self.lines[cell.y]
-                small_square = self.small_squares[self._switch_squares(f'{cell.x}{cell.y}')]
-                self._update_data(cell, column, line, small_square, self.empty_cells)
+                self._update_data(cell, *self._get_groups(cell), self.empty_cells)
                 if result:
                     result.update({'result': self._calculate_unknown_cells(), 'choice_value': choice_value})
                 else:
@@ -518,42 +667,193 @@ class Sudoku:
             self.small_squares = backup['small_square']
             choice_value += 1
 
-            return self._calculate_cell_variant(self.cells[f'{cell.x}{cell.y}'], backup, choice_value,
+            return self._calculate_cell_variant(self.cells[cell.index], backup, choice_value,
                                                 cell_value_options, result={'result': 'error'})
 
-    def calculate_result(self, cell_start=None, backup_dict=None):
+    def _calculate_core(self, engine, mode, branching, stats, budget, strategies, scheduler, branch_workers):
+        """ Вычисление результата на ядре BitBoard или DancingLinks с последующим переносом значений в клетки. """
+
+        values = self._get_values()
+        if engine == 'bitmask':
+            board = self._get_board(values)
+            try:
+                if branch_workers is not None:
+                    result = board.calculate_speculative(branch_workers, mode, branching, budget, strategies)
+                else:
+                    result = board.calculate_result(mode, branching, stats, budget, strategies, scheduler)
+            finally:
+                self.nodes = board.nodes
+        else:
+            board = DancingLinks(values, self.geometry)
+            try:
+                result = board.calculate_result(stats, budget)
+            finally:
+                self.nodes = board.nodes
+        self._set_values(result.board if isinstance(result, BudgetExceeded) else board.values)
+        return result
+
+    def _get_values(self):
+        """ Значения клеток в виде списка чисел, неизвестные значения - 0. """
+
+        digits = self.geometry.digits
+        return [digits.get(cell.value, 0) for cell in self.cells]
+
+    def count_solutions(self, limit=2, mode='trail', branching='mrv', strategies=()):
+        """
+        Подсчет решений судоку ядром BitBoard с остановкой, как только найдено limit решений.
+        Аргументы mode, branching и strategies - режим подбора значений, правило ветвления и дополнительные
+        алгоритмы исключения (см. BitBoard.calculate_result).
+        Значения клеток не изменяются, количество испробованных вариантов сохраняется в атрибут nodes.
+        """
+
+        try:
+            board = self._get_board(self._get_values())
+        except ValueError:
+            return 0
+        try:
+            return board.count_solutions(limit, mode, branching, strategies)
+        finally:
+            self.nodes = board.nodes
+
+    def has_unique_solution(self, mode='trail', branching='mrv', strategies=()):
+        """ Проверка того, что у судоку ровно одно решение. """
+
+        return self.count_solutions(2, mode, branching, strategies) == 1
+
+    def grade(self):
+        """ Оценка сложности судоку ядром BitBoard (Grade, см. BitBoard.grade). Значения клеток не изменяются. """
+
+        board = self._get_board(self._get_values())
+        try:
+            return board.grade()
+        finally:
+            self.nodes = board.nodes
+
+    def _set_values(self, values):
+        """
+        Перенос вычисленных значений в клетки с неизвестными значениями. Значения - числа или символы,
+        0 и любой символ, кроме символа алфавита поля, означают, что значение клетки не вычислено.
+        """
+
+        alphabet = self.geometry.alphabet
+        self.empty_cells = []
+        for cell, value in zip(self.cells, values):
+            if isinstance(value, int):
+                value = alphabet[value - 1] if value else '.'
+            if value in alphabet:
+                cell.value = value
+                cell.value_options = set()
+            elif cell.value not in alphabet:
+                self.empty_cells.append(0)
+
+    def calculate_result(self, cell_start=None, backup_dict=None, engine=None, mode='copy', branching='first',
+                         cache=None, stats=None, deadline=None, max_nodes=None, cancel=None, strategies=(),
+                         scheduler=None, branch_workers=None):
         """
         Метод, решающий судоку. Если стандартные алгоритмы не принесли результат,
         используется метод подбора возможных значений для каждой клетки с неизвестным значением.
 
+        Аргумент engine выбирает ядро вычисления: 'sets' - множества строковых значений клеток,
+        'bitmask' - битовые маски ядра BitBoard, 'dlx' - точное покрытие ядра DancingLinks. По умолчанию
+        используется ядро 'sets', а если задано ограничение deadline, max_nodes или cancel - ядро 'bitmask'.
+        Аргумент mode выбирает режим подбора значений ядра BitBoard: 'copy' - резервные копии
+        состояния, 'trail' - журнал изменений с откатом. Аргумент branching выбирает правило ветвления
+        ядра BitBoard (см. BitBoard.calculate_result), а strategies - включаемые дополнительные алгоритмы
+        исключения ядра BitBoard (BitBoard.STRATEGIES). Ядро 'sets' поддерживает только режим 'copy'
+        и правило 'first', ядро 'dlx' восстанавливает связи матрицы при возврате, выбирает условие
+        с наименьшим количеством вариантов и не использует mode и branching. Оба ядра не поддерживают
+        дополнительные алгоритмы исключения.
+
+        Аргумент scheduler - планировщик StrategyScheduler, который упорядочивает дополнительные алгоритмы
+        исключения ядра 'bitmask' по времени на одно исключение. Один планировщик можно передавать
+        в вычисления нескольких судоку, чтобы порядок учитывал их все.
+
+        Количество испробованных при подборе вариантов сохраняется в атрибут nodes.
+
+        Аргумент branch_workers включает параллельный подбор значений ядра 'bitmask' для одного сложного
+        судоку (BitBoard.calculate_speculative): верхние уровни дерева подбора распределяются между
+        branch_workers процессами (0 - по числу ядер). Решение совпадает с решением без него, сбор
+        статистики и ограничение max_nodes не поддерживаются.
+
+        Аргумент cache - кэш решений (например, sudoku_cache.SolutionCache): решение берется из кэша,
+        а при промахе вычисляется с теми же аргументами и сохраняется в кэш. Атрибут nodes при этом равен 0.
+
+        Аргумент stats - объект SolveStats, в который ядра 'bitmask' и 'dlx' записывают статистику
+        алгоритмов и подбора значений; он же сохраняется в атрибут stats. Без него статистика не собирается.
+
+        Ограничения подбора значений ядер 'bitmask' и 'dlx': deadline - время вычисления в секундах,
+        max_nodes - количество испробованных вариантов, cancel - признак отмены (CancelToken). При их
+        превышении возвращается результат BudgetExceeded, а в клетки переносятся значения, вычисленные
+        до начала подбора. Подбор этих ядер выполняется на явном стеке, без рекурсии. Ядро 'sets',
+        выбранное явно, ограничения не поддерживает.
+
+        Поля больше 9×9 решают только ядра 'bitmask' и 'dlx', без кэша.
+
         При попытке решить судоку, у которого нет верного решения, выбрасывается исключение.
         """
 
+        if stats is not None:
+            self.stats = stats
+        limits = {'deadline': deadline, 'max_nodes': max_nodes, 'cancel': cancel}
+        if engine is None:
+            # Рекурсивный подбор ядра 'sets' нельзя прервать: ограничения выполняет ядро 'bitmask'
+            engine = 'bitmask' if any(limit is not None for limit in limits.values()) else 'sets'
+        if self.geometry is not GEOMETRY and (cache is not None or engine == 'sets'):
+            raise ValueError(f'поле {self.geometry.size}×{self.geometry.size} решают только ядра bitmask и dlx без кэша')
+        if cache is not None:
+            self.nodes = 0
+            result = cache.solve(self.to_string(), engine=engine, mode=mode, branching=branching, stats=stats,
+                                 strategies=strategies, scheduler=scheduler, branch_workers=branch_workers,
+                                 **limits)
+            if isinstance(result, BudgetExceeded):
+                self._set_values(result.board)
+                return result
+            self._set_values(result)
+            return 'end'
+        if engine not in self.ENGINES:
+            raise ValueError(f'неизвестное ядро вычисления: {engine}')
+        elif strategies and engine != 'bitmask':
+            raise ValueError(f'дополнительные алгоритмы исключения не поддерживаются ядром {engine}')
+        elif branch_workers is not None and engine != 'bitmask':
+            raise ValueError(f'параллельный подбор значений не поддерживается ядром {engine}')
+        elif branch_workers is not None and stats is not None:
+            raise ValueError('сбор статистики не поддерживается параллельным подбором значений')
+        elif engine in ('bitmask', 'dlx'):
+            budget = Budget(**limits) if any(limit is not None for limit in limits.values()) else None
+            return self._calculate_core(engine, mode, branching, stats, budget, strategies, scheduler,
+                                        branch_workers)
+        elif stats is not None:
+            raise ValueError(f'сбор статистики не поддерживается ядром {engine}')
+        elif any(limit is not None for limit in limits.values()):
+            raise ValueError(f'ограничения вычисления не поддерживаются ядром {engine}')
+        elif mode != 'copy':
+            raise ValueError(f'режим подбора значений {mode} не поддерживается ядром {engine}')
+        elif branching != 'first':
+            raise ValueError(f'правило ветвления {branching} не поддерживается ядром {engine}')
+
         if not cell_start:
             backup_dict = {}
             self._definition_data()
             result = self._calculate_unknown_cells()
-            self_cells = self.cells
+            self_cells = range(81)
         else:
             result = 'not completed'
-            self.empty_cells = backup_dict[f'{cell_start.x}{cell_start.y}'][0]['empty_cells']
-            self.cells = backup_dict[f'{cell_start.x}{cell_start.y}'][0]['cells']
-            self.columns = backup_dict[f'{cell_start.x}{cell_start.y}'][0]['columns']
-            self.lines = backup_dict[f'{cell_start.x}{cell_start.y}'][0]['lines']
-            self.small_squares = backup_dict[f'{cell_start.x}{cell_start.y}'][0]['small_square']
-            list_key = list(self.cells.keys())
-            start = list_key.index(f'{cell_start.x}{cell_start.y}')
-            self_cells = {key: self.cells[key] for key in list_key[start:]}
+            self.empty_cells = backup_dict[cell_start.index][0]['empty_cells']
+            self.cells = backup_dict[cell_start.index][0]['cells']
+            self.columns = backup_dict[cell_start.index][0]['columns']
+            self.lines = backup_dict[cell_start.index][0]['lines']
+            self.small_squares = backup_dict[cell_start.index][0]['small_square']
+            self_cells = range(cell_start.index, 81)
         if result == 'not completed':
-            for key_cell in self_cells:
-                cell = self.cells[key_cell]
+            for index in self_cells:
+                cell = self.cells[index]
                 if len(cell.value_options):
                     backup = self._get_backup()
-                    cell_value_options = list(backup['cells'][f'{cell.x}{cell.y}'].value_options)
+                    cell_value_options = list(backup['cells'][index].value_options)
                     if result == 'continue' or not cell_start:
                         result = self._calculate_cell_variant(cell, backup, cell_value_options=cell_value_options)
                     else:
-                        f_key = f'{cell_start.x}{cell_start.y}'
+                        f_key = cell_start.index
                         if backup_dict[f_key][1] < (len(self.cells[f_key].value_options) - 1):
                             result = self._calculate_cell_variant(cell, backup,
                                                                   backup_dict[f_key][1] + 1,
@@ -563,14 +863,14 @@ class Sudoku:
                     if result['result'] != 'error':
                         if result.get('backup'):
                             backup = result.get('backup')
-                        backup_dict[f'{cell.x}{cell.y}'] = [backup, result['choice_value'], cell_value_options]
+                        backup_dict[index] = [backup, result['choice_value'], cell_value_options]
                     elif result['result'] == 'error':
                         first_key = next(iter(backup_dict))
-                        if not cell_start or first_key == f'{cell_start.x}{cell_start.y}':
+                        if not cell_start or first_key == cell_start.index:
                             break
                         else:
                             backup_dict_key = [i for i in backup_dict]
-                            index_cell_start = backup_dict_key.index(f'{cell_start.x}{cell_start.y}')
+                            index_cell_start = backup_dict_key.index(cell_start.index)
                             backup_dict_key = backup_dict_key[index_cell_start+1:]
                             check_choice_value = all(map(lambda x: x[1] == x[2],
                                                          [backup_dict[i] for i in backup_dict if i in backup_dict_key]))
@@ -585,16 +885,1526 @@ class Sudoku:
                         continue
         if self.empty_cells:
             for key in list(backup_dict.keys())[::-1]:
-                main_result = self.calculate_result(self.cells[key], backup_dict)
+                main_result = self.calculate_result(self.cells[key], backup_dict, engine='sets')
                 if main_result == 'end':
                     return 'end'
             if self.empty_cells:
                 raise ValueError('судоку не имеет решений')
 
 
+# Результат вычисления, прерванного ограничением: причина ('deadline', 'max_nodes' или 'cancelled'),
+# количество испробованных вариантов, время вычисления в секундах и поле, в котором неизвестные
+# значения обозначены точкой
+BudgetExceeded = namedtuple('BudgetExceeded', ['reason', 'nodes', 'elapsed', 'board'])
+
+# Оценка сложности судоку: числовая оценка, самый сложный примененный прием ('guess' при подборе значений),
+# количество испробованных вариантов подбора и количество применений каждого приема
+Grade = namedtuple('Grade', ['score', 'technique', 'guesses', 'steps'])
+
+
+class CancelToken:
+    """
+    Признак отмены вычисления, который можно установить из другого потока. Для отмены из другого
+    процесса передается multiprocessing.Event.
+    """
+
+    def __init__(self, event=None):
+        self.event = event if event is not None else threading.Event()
+
+    def cancel(self):
+        self.event.set()
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+
+class Budget:
+    """
+    Ограничения подбора значений: время вычисления deadline в секундах от создания объекта,
+    количество испробованных вариантов max_nodes и признак отмены cancel (CancelToken).
+    """
+
+    class Exceeded(Exception):
+        """ Исключение, прерывающее подбор значений; аргумент - причина. """
+
+    def __init__(self, deadline=None, max_nodes=None, cancel=None):
+        self.start = perf_counter()
+        self.deadline = None if deadline is None else self.start + deadline
+        self.max_nodes = max_nodes
+        self.cancel = cancel
+
+    def check(self, nodes):
+        """ Проверка ограничений перед очередным вариантом, nodes - количество уже испробованных вариантов. """
+
+        if self.max_nodes is not None and nodes >= self.max_nodes:
+            raise self.Exceeded('max_nodes')
+        if self.deadline is not None and perf_counter() >= self.deadline:
+            raise self.Exceeded('deadline')
+        if self.cancel is not None and self.cancel.cancelled:
+            raise self.Exceeded('cancelled')
+
+    def wait_time(self, interval):
+        """ Время ожидания до следующей проверки ограничений: interval, но не дольше, чем до deadline. """
+
+        if self.deadline is None:
+            return interval
+        return max(0.0, min(interval, self.deadline - perf_counter()))
+
+    def result(self, reason, nodes, values, geometry=GEOMETRY):
+        """ Результат BudgetExceeded для известных значений values поля geometry. """
+
+        alphabet = geometry.alphabet
+        board = ''.join(alphabet[value - 1] if value else '.' for value in values)
+        return BudgetExceeded(reason, nodes, perf_counter() - self.start, board)
+
+
+class StrategyScheduler:
+    """
+    Адаптивный порядок дорогих алгоритмов исключения. Для каждого алгоритма накапливаются время работы
+    и количество исключенных возможных значений; алгоритмы упорядочиваются по времени на одно
+    исключение, еще не выполнявшиеся - первыми.
+    """
+
+    def __init__(self):
+        self.time = {}
+        self.eliminations = {}
+
+    def cost(self, name):
+        """ Наблюдаемое время алгоритма на одно исключение (0 для еще не выполнявшегося). """
+
+        return self.time.get(name, 0.0) / (self.eliminations.get(name, 0) + 1)
+
+    def order(self, strategies):
+        """ Пары (название, алгоритм) в порядке возрастания стоимости. """
+
+        return sorted(strategies, key=lambda strategy: self.cost(strategy[0]))
+
+    def record(self, name, elapsed, eliminations):
+        """ Учет выполнения алгоритма: время в секундах и количество исключенных возможных значений. """
+
+        self.time[name] = self.time.get(name, 0.0) + elapsed
+        self.eliminations[name] = self.eliminations.get(name, 0) + eliminations
+
+
+class SolveStats:
+    """
+    Статистика вычисления судоку: для каждого алгоритма - количество вызовов, время работы,
+    количество исключенных возможных значений и установленных значений клеток, а также количество
+    попыток подбора, возвратов, наибольшая глубина подбора и общее время вычисления.
+
+    Функции on_strategy(name, eliminations, assignments, elapsed), on_guess(cell, value, depth)
+    и on_backtrack(cell, value, depth), если они переданы, вызываются при каждом таком событии.
+    """
+
+    class Strategy:
+        """ Класс, содержащий статистику одного алгоритма. """
+
+        def __init__(self):
+            self.calls = 0
+            self.time = 0.0
+            self.eliminations = 0
+            self.assignments = 0
+
+    def __init__(self, on_strategy=None, on_guess=None, on_backtrack=None):
+        self.on_strategy = on_strategy
+        self.on_guess = on_guess
+        self.on_backtrack = on_backtrack
+        self.strategies = {}
+        self.guesses = 0
+        self.backtracks = 0
+        self.max_depth = 0
+        self.time = 0.0
+
+    def strategy(self, name, eliminations, assignments, elapsed):
+        """ Запись одного вызова алгоритма name. """
+
+        try:
+            strategy = self.strategies[name]
+        except KeyError:
+            strategy = self.strategies[name] = self.Strategy()
+        strategy.calls += 1
+        strategy.time += elapsed
+        strategy.eliminations += eliminations
+        strategy.assignments += assignments
+        if self.on_strategy is not None:
+            self.on_strategy(name, eliminations, assignments, elapsed)
+
+    def guess(self, cell, value, depth):
+        """ Запись попытки подбора значения value клетки cell на глубине depth. """
+
+        self.guesses += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+        if self.on_guess is not None:
+            self.on_guess(cell, value, depth)
+
+    def backtrack(self, cell, value, depth):
+        """ Запись возврата после неудачной попытки подбора значения value клетки cell. """
+
+        self.backtracks += 1
+        if self.on_backtrack is not None:
+            self.on_backtrack(cell, value, depth)
+
+    def as_dict(self):
+        """ Статистика в виде словаря, пригодного для записи в JSON. """
+
+        return {
+            'strategies': {name: vars(strategy).copy() for name, strategy in self.strategies.items()},
+            'guesses': self.guesses,
+            'backtracks': self.backtracks,
+            'max_depth': self.max_depth,
+            'time': self.time,
+        }
+
+
+class BitBoard:
+    """
+    Альтернативное ядро вычисления судоку на битовых масках.
+
+    Возможные значения каждой клетки хранятся в виде битовой маски (9 бит для поля 9×9), а известные значения
+    столбцов, строк и малых квадратов - в виде масок использованных цифр. Реализует те же
+    алгоритмы поиска неизвестных значений, что и класс Sudoku, но выполняет их не для всего
+    поля на каждом проходе, а только для групп из очереди - тех, в которых изменились
+    возможные значения клеток. Установка значения клетки сразу исключает его из возможных
+    значений связанных клеток.
+
+    Подбор значений поддерживает два режима: 'copy' - резервная копия всего состояния на каждую
+    попытку, 'trail' - журнал изменений, сделанных после попытки, откат по которому выполняется
+    в обратном порядке.
+
+    Таблицы поля задает аргумент geometry (Geometry), по умолчанию они выбираются по количеству значений.
+
+    Дополнительные алгоритмы исключения STRATEGIES включаются аргументом strategies методов
+    calculate_result и count_solutions и выполняются для всего поля, когда очередь групп пуста.
+    """
+
+    MODES = ('copy', 'trail')
+    BRANCHING = ('first', 'mrv', 'mrv_degree', 'digit')
+    STRATEGIES = ('xy_wing', 'xyz_wing', 'fish', 'hidden_subsets')
+    # Приемы оценки сложности в порядке возрастания сложности и их оценки, оценка подбора значений
+    TECHNIQUES = (('naked_single', 1.0), ('hidden_single', 1.5), ('intersection', 2.0), ('naked_subsets', 3.0),
+                  ('fish', 3.2), ('hidden_subsets', 3.4), ('xy_wing', 4.2), ('xyz_wing', 4.4))
+    GUESS_SCORE = 5.0
+    # Количество поддеревьев параллельного подбора на один процесс и период проверки ограничений в секундах
+    SPLIT_FACTOR = 4
+    POLL_INTERVAL = 0.05
+
+    __slots__ = ('geometry', 'values', 'options', 'unit_values', 'blank', 'empty', 'trail', 'journal', 'nodes',
+                 'singles', 'dirty', 'queued', 'stats', 'basic', 'strategies', 'advanced', 'scheduler')
+
+    def __init__(self, values, geometry=None):
+        self.geometry = geometry = geometry or Geometry.from_length(len(values))
+        self.values = [0] * geometry.cells
+        self.options = [geometry.all_options] * geometry.cells
+        self.unit_values = [0] * len(geometry.units)
+        # Исходное состояние списков поля и признаков очереди, которое восстанавливает reset
+        self.blank = (tuple(self.values), tuple(self.options), tuple(self.unit_values), (True,) * len(geometry.units))
+        # Журнал изменений режима 'trail': пары (клетка, прежние возможные значения),
+        # установка значения клетки записывается как (клетка + количество клеток, значение).
+        # Все вычисления используют один и тот же список journal
+        self.trail = None
+        self.journal = []
+        # Клетки, у которых осталось не больше одного возможного значения, и очередь групп для проверки
+        self.singles = []
+        self.dirty = deque()
+        self.queued = list(self.blank[3])
+        # Алгоритмы исключения, статистика вычисления (SolveStats) и алгоритмы, которые при ее сборе
+        # заменяются обертками
+        self.basic = (self._set_singles, self._search_unique_value,
+                      self._optimization_value_options, self._search_intersection)
+        # Планировщик порядка дополнительных алгоритмов исключения сохраняется между судоку
+        self.scheduler = StrategyScheduler()
+        self.reset(values)
+
+    def reset(self, values):
+        """
+        Загрузка нового судоку (значения values, неизвестные значения - 0) того же размера поля в уже
+        созданные списки ядра. Очередь групп, журнал изменений, статистика и дополнительные алгоритмы
+        исключения возвращаются к исходному состоянию, планировщик сохраняется. Возвращает само ядро.
+        """
+
+        geometry = self.geometry
+        if len(values) != geometry.cells:
+            raise ValueError(f'в судоку должно быть {geometry.cells} значений')
+        blank_values, blank_options, blank_unit_values, blank_queued = self.blank
+        self.values[:] = blank_values
+        self.options[:] = blank_options
+        self.unit_values[:] = blank_unit_values
+        self.queued[:] = blank_queued
+        self.empty = geometry.cells
+        self.trail = None
+        self.journal.clear()
+        # Количество испробованных при подборе вариантов значений
+        self.nodes = 0
+        self.singles.clear()
+        self.dirty.clear()
+        self.dirty.extend(range(len(geometry.units)))
+        self.stats = None
+        self.strategies = self.basic
+        # Включенные дополнительные алгоритмы исключения (пары название, метод)
+        self.advanced = ()
+        for cell, value in enumerate(values):
+            if value:
+                self._update_data(cell, value)
+        return self
+
+    def _set_trail(self, mode):
+        """ Включение журнала изменений в режиме 'trail' (очищенный список journal) либо его отключение. """
+
+        if mode == 'trail':
+            self.journal.clear()
+            self.trail = self.journal
+        else:
+            self.trail = None
+
+    def _update_data(self, cell, value):
+        """
+        Установка значения клетки, обновление масок столбца, строки и квадрата, в которых она находится,
+        и исключение значения из возможных значений связанных клеток.
+        """
+
+        geometry = self.geometry
+        bit = 1 << (value - 1)
+        units = geometry.cell_units[cell]
+        unit_values = self.unit_values
+        for unit in units:
+            if unit_values[unit] & bit:
+                raise ValueError(f'невозможное значение клетки {geometry.cell_name(cell)}: '
+                                 f'{geometry.alphabet[value - 1]}')
+        for unit in units:
+            unit_values[unit] |= bit
+            if not self.queued[unit]:
+                self.queued[unit] = True
+                self.dirty.append(unit)
+        if self.trail is not None:
+            self.trail += (cell, self.options[cell], cell + geometry.cells, value)
+        self.values[cell] = value
+        self.options[cell] = 0
+        self.empty -= 1
+
+        options = self.options
+        for peer in geometry.peers[cell]:
+            if options[peer] & bit:
+                self._eliminate(peer, bit)
+
+    def _eliminate(self, cell, values_mask):
+        """
+        Исключение значений маски из возможных значений клетки с записью в журнал изменений и
+        добавлением групп клетки в очередь. Клетка с одним возможным значением или без возможных
+        значений добавляется в список для установки значения.
+        """
+
+        cell_options = self.options[cell]
+        if self.trail is not None:
+            self.trail += (cell, cell_options)
+        cell_options &= ~values_mask
+        self.options[cell] = cell_options
+        if self.geometry.popcount[cell_options] < 2:
+            self.singles.append(cell)
+        queued = self.queued
+        for unit in self.geometry.cell_units[cell]:
+            if not queued[unit]:
+                queued[unit] = True
+                self.dirty.append(unit)
+
+    def _set_singles(self):
+        """
+        Установка значений клеток, у которых осталось одно возможное значение. Клетка с неизвестным
+        значением без возможных значений означает, что решения нет.
+        """
+
+        singles, values, options, lowest_bit = self.singles, self.values, self.options, self.geometry.lowest_bit
+        while singles:
+            cell = singles.pop()
+            if not values[cell]:
+                if not options[cell]:
+                    raise ValueError
+                self._update_data(cell, lowest_bit[options[cell]])
+
+    def _get_unknown_cells(self, unit):
+        """ Возвращает все клетки группы с неизвестным значением и несколькими возможными значениями. """
+
+        options, popcount = self.options, self.geometry.popcount
+        return [cell for cell in self.geometry.units[unit] if popcount[options[cell]] > 1]
+
+    def _optimization_value_options(self, unit):
+        """
+        Алгоритм исключения возможных значений, основанный на сравнении
+        групп возможных значений клеток столбца, строки или малого квадрата.
+        """
+
+        options, popcount = self.options, self.geometry.popcount
+        unknown_cells = self._get_unknown_cells(unit)
+        for group_len in range(2, len(unknown_cells)):
+            for cell_1 in unknown_cells:
+                group_options = options[cell_1]
+                if popcount[group_options] != group_len:
+                    continue
+                # Группу составляют клетки, возможные значения которых являются подмножеством первой
+                group = [cell_2 for cell_2 in unknown_cells
+                         if cell_2 == cell_1
+                         or (2 <= popcount[options[cell_2]] <= group_len and not options[cell_2] & ~group_options)]
+                if len(group) != group_len:
+                    continue
+                for cell in unknown_cells:
+                    if cell not in group and options[cell] & group_options:
+                        self._eliminate(cell, group_options)
+
+    def _search_unique_value(self, unit):
+        """
+        Поиск уникальных возможных значений среди всех возможных значений клеток столбца, строки
+        или малого квадрата. Найденные значения становятся значениями клеток. Значение, которое
+        не может находиться ни в одной клетке группы, означает, что решения нет.
+        """
+
+        options, geometry = self.options, self.geometry
+        cells = geometry.units[unit]
+        once = twice = 0
+        for cell in cells:
+            twice |= once & options[cell]
+            once |= options[cell]
+        if (once | self.unit_values[unit]) != geometry.all_options:
+            raise ValueError
+        unique = once & ~twice
+        while unique:
+            bit = unique & -unique
+            unique ^= bit
+            for cell in cells:
+                if options[cell] & bit:
+                    self._update_data(cell, geometry.lowest_bit[bit])
+                    break
+            else:
+                # Клетка значения уже получила другое уникальное значение
+                raise ValueError
+
+    def _search_intersection(self, unit):
+        """
+        Сокращение возможных значений на пересечениях группы с группами другого вида.
+
+        Если значение в группе может находиться только на пересечении с другой группой
+        (например, в малом квадрате - только в одной строке), то в остальных клетках
+        пересекающей группы этого значения быть не может.
+        """
+
+        options = self.options
+        for segments in self.geometry.unit_segments[unit]:
+            masks = []
+            for segment, _ in segments:
+                mask = 0
+                for cell in segment:
+                    mask |= options[cell]
+                masks.append(mask)
+            for number, (_, outside) in enumerate(segments):
+                confined = masks[number]
+                for other, mask in enumerate(masks):
+                    if other != number:
+                        confined &= ~mask
+                if confined:
+                    for cell in outside:
+                        if options[cell] & confined:
+                            self._eliminate(cell, confined)
+
+    def _search_hidden_subsets(self):
+        """
+        Поиск скрытых пар и троек: если k значений группы могут находиться только в одних и тех же
+        k клетках, остальные возможные значения этих клеток исключаются. Возвращает количество
+        исключенных возможных значений.
+        """
+
+        options, geometry = self.options, self.geometry
+        popcount, mask_digits = geometry.popcount, geometry.mask_digits
+        eliminated = 0
+        for cells in geometry.units:
+            unknown = [cell for cell in cells if options[cell]]
+            # В группе из k неизвестных клеток остальные значения скрытой группы из k значений исключать неоткуда
+            if len(unknown) < 4:
+                continue
+            # Маски номеров клеток группы, в которых может находиться каждое значение
+            places = {}
+            for index, cell in enumerate(unknown):
+                for digit in mask_digits[options[cell]]:
+                    places[digit] = places.get(digit, 0) | 1 << index
+            places = {1 << (digit - 1): mask for digit, mask in places.items() if 2 <= popcount[mask] <= 3}
+            for size in (2, 3):
+                for bits in combinations(places, size):
+                    mask = 0
+                    for bit in bits:
+                        mask |= places[bit]
+                    if popcount[mask] != size:
+                        continue
+                    subset = sum(bits)
+                    for index, cell in enumerate(unknown):
+                        if mask >> index & 1 and options[cell] & ~subset and popcount[options[cell]] > 1:
+                            eliminated += popcount[options[cell] & ~subset]
+                            self._eliminate(cell, options[cell] & ~subset)
+        return eliminated
+
+    def _search_fish(self):
+        """
+        Поиск рыб X-Wing и Swordfish: если в k строках значение может находиться только в одних
+        и тех же k столбцах, то в остальных клетках этих столбцов его быть не может (и наоборот).
+        Возвращает количество исключенных возможных значений.
+        """
+
+        options, geometry = self.options, self.geometry
+        size, popcount, mask_digits = geometry.size, geometry.popcount, geometry.mask_digits
+        eliminated = 0
+        for bases, covers in ((geometry.lines, geometry.columns), (geometry.columns, geometry.lines)):
+            # Для каждого значения - маски номеров пересекающих групп, в которых оно может находиться
+            # в каждой базовой группе
+            digit_places = [[0] * size for _ in range(size + 1)]
+            for number, cells in enumerate(bases):
+                for index, cell in enumerate(cells):
+                    for digit in mask_digits[options[cell]]:
+                        digit_places[digit][number] |= 1 << index
+            for digit in range(1, size + 1):
+                bit = 1 << (digit - 1)
+                places = {number: mask for number, mask in enumerate(digit_places[digit])
+                          if 2 <= popcount[mask] <= 3}
+                for fish in (2, 3):
+                    for numbers in combinations(places, fish):
+                        mask = 0
+                        for number in numbers:
+                            mask |= places[number]
+                        if popcount[mask] != fish:
+                            continue
+                        for index in range(size):
+                            if mask >> index & 1:
+                                for other, cell in enumerate(covers[index]):
+                                    if other not in numbers and options[cell] & bit:
+                                        eliminated += 1
+                                        self._eliminate(cell, bit)
+        return eliminated
+
+    def _search_xy_wing(self):
+        """
+        Поиск XY-Wing: клетка с возможными значениями {x, y} видит клетки {x, z} и {y, z}, тогда
+        значение z исключается из клеток, которые видят обе последние. Возвращает количество исключенных
+        возможных значений.
+        """
+
+        options, geometry = self.options, self.geometry
+        popcount, peers = geometry.popcount, geometry.peers
+        eliminated = 0
+        for pivot in range(geometry.cells):
+            pivot_options = options[pivot]
+            if popcount[pivot_options] != 2:
+                continue
+            wings = [cell for cell in peers[pivot]
+                     if popcount[options[cell]] == 2 and popcount[options[cell] & pivot_options] == 1]
+            for first, second in combinations(wings, 2):
+                common = options[first] & options[second]
+                if popcount[common] != 1 or common & pivot_options or \
+                        (options[first] | options[second]) & pivot_options != pivot_options:
+                    continue
+                for cell in set(peers[first]).intersection(peers[second]):
+                    if options[cell] & common:
+                        eliminated += 1
+                        self._eliminate(cell, common)
+        return eliminated
+
+    def _search_xyz_wing(self):
+        """
+        Поиск XYZ-Wing: клетка с возможными значениями {x, y, z} видит клетки {x, z} и {y, z}, тогда
+        значение z исключается из клеток, которые видят все три. Возвращает количество исключенных
+        возможных значений.
+        """
+
+        options, geometry = self.options, self.geometry
+        popcount, peers = geometry.popcount, geometry.peers
+        eliminated = 0
+        for pivot in range(geometry.cells):
+            pivot_options = options[pivot]
+            if popcount[pivot_options] != 3:
+                continue
+            wings = [cell for cell in peers[pivot]
+                     if popcount[options[cell]] == 2 and not options[cell] & ~pivot_options]
+            for first, second in combinations(wings, 2):
+                common = options[first] & options[second]
+                if popcount[common] != 1 or options[first] | options[second] != pivot_options:
+                    continue
+                for cell in set(peers[pivot]).intersection(peers[first], peers[second]):
+                    if options[cell] & common:
+                        eliminated += 1
+                        self._eliminate(cell, common)
+        return eliminated
+
+    def _set_strategies(self, strategies):
+        """ Включение дополнительных алгоритмов исключения по их названиям из STRATEGIES. """
+
+        for name in strategies:
+            if name not in self.STRATEGIES:
+                raise ValueError(f'неизвестный алгоритм исключения: {name}')
+        self.advanced = tuple((name, getattr(self, f'_search_{name}'))
+                              for name in self.STRATEGIES if name in strategies)
+
+    def _calculate_unknown_cells(self):
+        """
+        Вычисление неизвестных значений клеток: сначала устанавливаются значения клеток с одним
+        возможным значением, затем для очередной группы из очереди выполняется поиск уникальных
+        значений, а если он ничего не дал - алгоритмы исключения возможных значений. Изменения
+        возможных значений добавляют в очередь только группы измененных клеток. Когда очередь
+        пуста, включенные дополнительные алгоритмы выполняются в порядке планировщика self.scheduler,
+        пока один из них не изменит возможные значения.
+
+        В случае полного вычисления возвращается сообщение 'end', иначе 'not completed'.
+        """
+
+        dirty, queued = self.dirty, self.queued
+        set_singles, search_unique_value, optimization_value_options, search_intersection = self.strategies
+        while True:
+            set_singles()
+            if not self.empty:
+                self._clear_queue()
+                return 'end'
+            if not dirty:
+                for name, strategy in self.scheduler.order(self.advanced):
+                    start = perf_counter()
+                    eliminations = strategy()
+                    self.scheduler.record(name, perf_counter() - start, eliminations)
+                    if self.singles or dirty:
+                        break
+                else:
+                    return 'not completed'
+                continue
+            unit = dirty.popleft()
+            queued[unit] = False
+            search_unique_value(unit)
+            if self.singles or queued[unit]:
+                continue
+            optimization_value_options(unit)
+            search_intersection(unit)
+
+    def _measured(self, name, method):
+        """
+        Обертка алгоритма, записывающая в статистику время его работы, количество исключенных
+        возможных значений (кроме ставших значениями клеток) и установленных значений клеток.
+        """
+
+        stats, options, popcount = self.stats, self.options, self.geometry.popcount
+
+        def measured(*args):
+            candidates = sum(popcount[cell_options] for cell_options in options)
+            empty = self.empty
+            start = perf_counter()
+            try:
+                return method(*args)
+            finally:
+                elapsed = perf_counter() - start
+                assignments = empty - self.empty
+                eliminations = candidates - sum(popcount[cell_options] for cell_options in options) - assignments
+                stats.strategy(name, eliminations, assignments, elapsed)
+
+        return measured
+
+    def _clear_queue(self):
+        """ Очистка очереди групп и списка клеток для установки значения. """
+
+        for unit in self.dirty:
+            self.queued[unit] = False
+        self.dirty.clear()
+        self.singles.clear()
+
+    def _get_backup(self):
+        """ Создание резервной копии состояния. В режиме 'trail' это только текущая длина журнала изменений. """
+
+        if self.trail is not None:
+            return len(self.trail)
+        return self.values.copy(), self.options.copy(), self.unit_values.copy(), self.empty
+
+    def _set_backup(self, backup):
+        """ Восстановление состояния из резервной копии либо откат журнала изменений до сохраненной длины. """
+
+        self._clear_queue()
+        if self.trail is None:
+            values, options, unit_values, self.empty = backup
+            self.values[:] = values
+            self.options[:] = options
+            self.unit_values[:] = unit_values
+            return
+
+        trail, values, options, unit_values = self.trail, self.values, self.options, self.unit_values
+        cells, cell_units = self.geometry.cells, self.geometry.cell_units
+        while len(trail) > backup:
+            old = trail.pop()
+            cell = trail.pop()
+            if cell < cells:
+                options[cell] = old
+            else:
+                cell -= cells
+                bit = ~(1 << (old - 1))
+                for unit in cell_units[cell]:
+                    unit_values[unit] &= bit
+                values[cell] = 0
+                self.empty += 1
+
+    def _branch_first(self):
+        """ Варианты значений первой клетки с неизвестным значением. """
+
+        cell = self.values.index(0)
+        return [(cell, value) for value in self.geometry.mask_digits[self.options[cell]]]
+
+    def _branch_mrv(self):
+        """ Варианты значений клетки с наименьшим количеством возможных значений. """
+
+        geometry = self.geometry
+        popcount = geometry.popcount
+        best, best_count = None, geometry.size + 1
+        for cell, cell_options in enumerate(self.options):
+            count = popcount[cell_options]
+            if count < best_count and not self.values[cell]:
+                best, best_count = cell, count
+                if count < 3:
+                    break
+        return [(best, value) for value in geometry.mask_digits[self.options[best]]]
+
+    def _branch_mrv_degree(self):
+        """
+        Варианты значений клетки с наименьшим количеством возможных значений, а из таких клеток -
+        с наибольшим количеством связанных клеток с неизвестным значением.
+        """
+
+        values, options, geometry = self.values, self.options, self.geometry
+        best, best_key = None, None
+        for cell in range(geometry.cells):
+            if values[cell]:
+                continue
+            degree = 0
+            for peer in geometry.peers[cell]:
+                if not values[peer]:
+                    degree += 1
+            key = (geometry.popcount[options[cell]], -degree)
+            if best_key is None or key < best_key:
+                best, best_key = cell, key
+        return [(best, value) for value in geometry.mask_digits[options[best]]]
+
+    def _branch_digit(self):
+        """
+        Варианты расположения цифры, которая может находиться в наименьшем количестве клеток группы.
+        """
+
+        values, options, unit_values, geometry = self.values, self.options, self.unit_values, self.geometry
+        best, best_count = None, geometry.size + 1
+        for number, unit in enumerate(geometry.units):
+            free = geometry.all_options & ~unit_values[number]
+            for digit in geometry.mask_digits[free]:
+                bit = 1 << (digit - 1)
+                cells = [cell for cell in unit if options[cell] & bit]
+                if len(cells) < best_count:
+                    best, best_count = [(cell, digit) for cell in cells], len(cells)
+                    if best_count < 2:
+                        return best
+        # Клетка с неизвестным значением без возможных значений не может быть заполнена
+        for cell in range(geometry.cells):
+            if not values[cell] and not options[cell]:
+                return []
+        return best
+
+    def _search(self, branching, limit=1, budget=None):
+        """
+        Подбор значений на явном стеке: каждый уровень стека - варианты правила ветвления, резервная
+        копия состояния перед текущим вариантом и сам вариант. После варианта, который привел
+        к противоречию, или исчерпания вариантов следующего уровня состояние восстанавливается
+        и испытывается следующий вариант.
+
+        Поиск прекращается на limit-м решении, состояние при этом остается решенным. Возвращает
+        количество найденных решений. Ограничения budget (Budget) проверяются перед каждым вариантом.
+        """
+
+        stats = self.stats
+        count = 0
+        stack = [[iter(branching()), None, None]]
+        while stack:
+            frame = stack[-1]
+            variants, backup, variant = frame
+            if backup is not None:
+                if stats is not None:
+                    stats.backtrack(*variant, len(stack))
+                self._set_backup(backup)
+                frame[1] = None
+            variant = next(variants, None)
+            if variant is None:
+                stack.pop()
+                continue
+            if budget is not None:
+                budget.check(self.nodes)
+            self.nodes += 1
+            if stats is not None:
+                stats.guess(*variant, len(stack))
+            frame[1], frame[2] = self._get_backup(), variant
+            try:
+                self._update_data(*variant)
+                if self._calculate_unknown_cells() == 'end':
+                    count += 1
+                    if count >= limit:
+                        return count
+                    continue
+            except ValueError:
+                continue
+            stack.append([iter(branching()), None, None])
+        return count
+
+    def _apply(self, prefix):
+        """ Установка вариантов prefix (клетка, значение) по порядку с вычислением после каждого из них. """
+
+        result = 'not completed'
+        for variant in prefix:
+            self._update_data(*variant)
+            result = self._calculate_unknown_cells()
+        return result
+
+    def _split(self, branching, count, budget=None):
+        """
+        Разбиение верхних уровней дерева подбора значений на поддеревья: варианты правила ветвления
+        раскрываются уровень за уровнем, пока поддеревьев меньше count. Поддерево задается префиксом -
+        кортежем вариантов от корня, префиксы возвращаются в порядке обхода _search. Варианты,
+        приводящие к противоречию, отбрасываются, а префикс, после которого судоку решено, завершает
+        список: следующие за ним поддеревья не могут содержать первое решение.
+
+        Возвращает список префиксов и признак того, что последний из них решает судоку. Ограничения
+        budget (Budget) проверяются перед каждым вариантом.
+        """
+
+        root = self._get_backup()
+        prefixes, solved = [()], False
+        while prefixes and len(prefixes) < count and not solved:
+            expanded = []
+            for prefix in prefixes:
+                self._set_backup(root)
+                self._apply(prefix)
+                backup = self._get_backup()
+                for variant in branching():
+                    if budget is not None:
+                        budget.check(self.nodes)
+                    self.nodes += 1
+                    try:
+                        self._update_data(*variant)
+                        result = self._calculate_unknown_cells()
+                    except ValueError:
+                        continue
+                    finally:
+                        self._set_backup(backup)
+                    expanded.append(prefix + (variant,))
+                    if result == 'end':
+                        solved = True
+                        break
+                if solved:
+                    break
+            prefixes = expanded
+        self._set_backup(root)
+        return prefixes, solved
+
+    def _get_branching(self, mode, branching):
+        """ Проверка режима подбора значений и получение функции правила ветвления. """
+
+        if mode not in self.MODES:
+            raise ValueError(f'неизвестный режим подбора значений: {mode}')
+        if callable(branching):
+            return partial(branching, self)
+        elif branching in self.BRANCHING:
+            return getattr(self, f'_branch_{branching}')
+        raise ValueError(f'неизвестное правило ветвления: {branching}')
+
+    def count_solutions(self, limit=2, mode='trail', branching='mrv', strategies=()):
+        """
+        Подсчет решений судоку, но не больше limit: подбор значений прекращается, как только найдено
+        limit решений (для проверки единственности решения достаточно limit=2). Использует те же
+        алгоритмы исключения и подбор значений, что и calculate_result, но не сохраняет решения.
+        """
+
+        branching = self._get_branching(mode, branching)
+        self._set_strategies(strategies)
+        self.nodes = 0
+        try:
+            if self._calculate_unknown_cells() == 'end':
+                return 1
+        except ValueError:
+            return 0
+        if limit < 1:
+            return 0
+        self._set_trail(mode)
+        try:
+            return self._search(branching, limit)
+        finally:
+            self.trail = None
+
+    def _apply_technique(self, name, stale):
+        """
+        Применение приема оценки сложности name. Приемы для одной группы выполняются только для групп,
+        отмеченных в stale (изменившихся с прошлой проверки), до первой группы, в которой прием
+        изменил возможные значения. Возвращает признак изменения возможных значений.
+        """
+
+        if name not in stale:
+            getattr(self, f'_search_{name}')()
+            return bool(self.singles or self.dirty)
+        flags = stale[name]
+        method = self._search_intersection if name == 'intersection' else self._optimization_value_options
+        for unit, flag in enumerate(flags):
+            if flag:
+                flags[unit] = False
+                method(unit)
+                if self.singles or self.dirty:
+                    return True
+        return False
+
+    def grade(self):
+        """
+        Оценка сложности судоку. Приемы TECHNIQUES применяются в порядке возрастания сложности,
+        после каждого результативного применения вычисление снова начинается с одиночек. Если приемов
+        недостаточно, подбор значений по правилу 'mrv' в режиме 'trail' ищет второе решение, и количество
+        испробованных вариантов определяет объем подбора. Резервные копии состояния не создаются,
+        состояние поля после оценки не сохраняет решения.
+
+        Возвращает Grade с оценкой самого сложного приема (GUESS_SCORE при подборе) плюс
+        log2(1 + количество вариантов подбора). Для судоку без решения выбрасывается исключение.
+        """
+
+        dirty, queued, singles = self.dirty, self.queued, self.singles
+        # Группы, изменившиеся после последней проверки приемами для одной группы
+        stale = {'intersection': [True] * len(queued), 'naked_subsets': [True] * len(queued)}
+        steps = dict.fromkeys((name for name, _ in self.TECHNIQUES), 0)
+        hardest = 0
+        self.nodes = 0
+        try:
+            while True:
+                while True:
+                    if singles:
+                        empty = self.empty
+                        self._set_singles()
+                        steps['naked_single'] += empty - self.empty
+                    if not self.empty or not dirty:
+                        break
+                    unit = dirty.popleft()
+                    queued[unit] = False
+                    for flags in stale.values():
+                        flags[unit] = True
+                    empty = self.empty
+                    self._search_unique_value(unit)
+                    if self.empty < empty:
+                        steps['hidden_single'] += empty - self.empty
+                        hardest = max(hardest, 1)
+                if not self.empty:
+                    break
+                for level, (name, _) in enumerate(self.TECHNIQUES[2:], 2):
+                    if self._apply_technique(name, stale):
+                        steps[name] += 1
+                        hardest = max(hardest, level)
+                        break
+                else:
+                    break
+            if self.empty:
+                self._set_trail('trail')
+                if not self._search(self._branch_mrv, limit=2):
+                    raise ValueError
+        except ValueError:
+            raise ValueError('судоку не имеет решений') from None
+        finally:
+            self.trail = None
+        if self.nodes:
+            return Grade(round(self.GUESS_SCORE + log2(1 + self.nodes), 2), 'guess', self.nodes, steps)
+        name, score = self.TECHNIQUES[hardest]
+        return Grade(score, name, 0, steps)
+
+    def calculate_result(self, mode='copy', branching='first', stats=None, budget=None, strategies=(), scheduler=None):
+        """
+        Метод, решающий судоку. Если алгоритмы исключения не принесли результат,
+        используется подбор возможных значений клеток в режиме mode ('copy' или 'trail').
+
+        Аргумент branching задает правило выбора ветвления: 'first' - первая клетка с неизвестным
+        значением, 'mrv' - клетка с наименьшим количеством возможных значений, 'mrv_degree' - то же
+        с выбором из равных клеток той, у которой больше всего связанных неизвестных клеток, 'digit' -
+        цифра, которая может находиться в наименьшем количестве клеток группы. Также можно передать
+        функцию, которая принимает BitBoard и возвращает список вариантов (клетка, значение).
+        Количество испробованных вариантов сохраняется в атрибут nodes.
+
+        Аргумент strategies - названия включаемых дополнительных алгоритмов исключения из STRATEGIES:
+        'hidden_subsets' - скрытые пары и тройки, 'fish' - X-Wing и Swordfish, 'xy_wing', 'xyz_wing'.
+        Их порядок определяет планировщик scheduler (StrategyScheduler) по наблюдаемому времени
+        на одно исключение; по умолчанию - собственный планировщик ядра.
+
+        Если передан объект stats (SolveStats), в него записывается статистика каждого алгоритма
+        (правило ветвления записывается как алгоритм 'branching') и подбора значений. Без него
+        алгоритмы вызываются напрямую.
+
+        Если передан объект budget (Budget) и подбор значений превысил его ограничения, возвращается
+        результат BudgetExceeded с полем, вычисленным алгоритмами исключения до начала подбора.
+
+        При попытке решить судоку, у которого нет верного решения, выбрасывается исключение.
+        """
+
+        branching = self._get_branching(mode, branching)
+        self._set_strategies(strategies)
+        if scheduler is not None:
+            self.scheduler = scheduler
+        self.nodes = 0
+        self.stats = stats
+        if stats is not None:
+            self.strategies = tuple(self._measured(method.__name__.lstrip('_'), method) for method in self.strategies)
+            self.advanced = tuple((name, self._measured(method.__name__.lstrip('_'), method))
+                                  for name, method in self.advanced)
+            branching = self._measured('branching', branching)
+            start = perf_counter()
+        try:
+            if self._calculate_unknown_cells() == 'end':
+                return 'end'
+            self._set_trail(mode)
+            known = self.values.copy()
+            if self._search(branching, budget=budget):
+                return 'end'
+        except ValueError:
+            pass
+        except Budget.Exceeded as error:
+            return budget.result(error.args[0], self.nodes, known, self.geometry)
+        finally:
+            self.trail = None
+            if stats is not None:
+                stats.time += perf_counter() - start
+        raise ValueError('судоку не имеет решений')
+
+    def calculate_speculative(self, workers=None, mode='copy', branching='first', budget=None, strategies=()):
+        """
+        Решение судоку с параллельным подбором значений: верхние уровни дерева подбора разбиваются
+        на поддеревья (примерно SPLIT_FACTOR на процесс), которые обходят workers процессов (по умолчанию -
+        по числу ядер). Процессы разделяют номер поддерева с найденным решением: поддеревья после него
+        отменяются сразу, а предшествующие обходятся до конца. Поэтому результат не зависит от того,
+        какой процесс закончит первым, и совпадает с результатом calculate_result с теми же mode,
+        branching и strategies. Функция branching должна быть доступна в процессах по имени модуля.
+
+        Ограничения budget (Budget) проверяются в текущем процессе перед ожиданием каждого поддерева
+        и во время ожидания каждые POLL_INTERVAL секунд, ограничение max_nodes не поддерживается.
+        Атрибут nodes - сумма вариантов всех завершенных поддеревьев.
+        """
+
+        if budget is not None and budget.max_nodes is not None:
+            raise ValueError('ограничение max_nodes не поддерживается параллельным подбором значений')
+        rule = self._get_branching(mode, branching)
+        self._set_strategies(strategies)
+        self.nodes = 0
+        self.stats = None
+        workers = workers or os.cpu_count() or 1
+        try:
+            if self._calculate_unknown_cells() == 'end':
+                return 'end'
+            known = self.values.copy()
+            prefixes, solved = self._split(rule, workers * self.SPLIT_FACTOR, budget)
+        except ValueError:
+            prefixes, solved = [], False
+        except Budget.Exceeded as error:
+            return budget.result(error.args[0], self.nodes, known, self.geometry)
+        if solved and len(prefixes) == 1:
+            self._apply(prefixes[0])
+            return 'end'
+        if not prefixes:
+            raise ValueError('судоку не имеет решений')
+
+        found = multiprocessing.Value('i', len(prefixes))
+        executor = ProcessPoolExecutor(min(workers, len(prefixes)), initializer=_init_branch_worker,
+                                       initargs=(found,))
+        futures = [executor.submit(_search_branch, known, self.geometry.box, prefix, number, mode, branching,
+                                   strategies) for number, prefix in enumerate(prefixes)]
+        solution, solved, number = None, -1, -1
+        try:
+            for number, future in enumerate(futures):
+                while True:
+                    timeout = None
+                    if budget is not None:
+                        budget.check(self.nodes)
+                        timeout = budget.wait_time(self.POLL_INTERVAL)
+                    try:
+                        solution, nodes = future.result(timeout)
+                        break
+                    except TimeoutError:
+                        pass
+                self.nodes += nodes
+                if budget is not None:
+                    budget.check(self.nodes)
+                if solution is not None:
+                    solved = number
+                    break
+        except Budget.Exceeded as error:
+            return budget.result(error.args[0], self.nodes, known, self.geometry)
+        finally:
+            # Отмена поддеревьев после решенного, а при ошибке или превышении ограничений - всех
+            with found.get_lock():
+                found.value = min(found.value, solved)
+            executor.shutdown(cancel_futures=True)
+            for future in futures[number + 1:]:
+                if not future.cancelled() and future.exception() is None:
+                    self.nodes += future.result()[1]
+        if solution is None:
+            raise ValueError('судоку не имеет решений')
+        for cell, value in enumerate(solution):
+            if not self.values[cell]:
+                self._update_data(cell, value)
+        self._clear_queue()
+        return 'end'
+
+
+class _BranchCancel:
+    """
+    Признак отмены поддерева number параллельного подбора для CancelToken: установлен, если
+    в поддереве с меньшим номером найдено решение или отменены все поддеревья.
+    """
+
+    def __init__(self, found, number):
+        self.found = found
+        self.number = number
+
+    def is_set(self):
+        return self.found.value < self.number
+
+
+# Номер поддерева с найденным решением (multiprocessing.Value), общий для процессов параллельного подбора
+_branch_found = None
+
+
+def _init_branch_worker(found):
+    """ Инициализация процесса параллельного подбора значений. """
+
+    global _branch_found
+    _branch_found = found
+
+
+def _search_branch(values, box, prefix, number, mode, branching, strategies):
+    """
+    Подбор значений в поддереве number, которое начинается вариантами prefix (BitBoard.calculate_speculative).
+    Возвращает значения решения (None, если решения нет или поддерево отменено) и количество
+    испробованных вариантов. При найденном решении отменяет поддеревья с большими номерами.
+    """
+
+    board = BitBoard(values, Geometry.get(box))
+    rule = board._get_branching(mode, branching)
+    board._set_strategies(strategies)
+    budget = Budget(cancel=CancelToken(_BranchCancel(_branch_found, number)))
+    try:
+        if board._calculate_unknown_cells() != 'end' and board._apply(prefix) != 'end':
+            board._set_trail(mode)
+            if not board._search(rule, budget=budget):
+                return None, board.nodes
+    except (ValueError, Budget.Exceeded):
+        return None, board.nodes
+    with _branch_found.get_lock():
+        _branch_found.value = min(_branch_found.value, number)
+    return board.values, board.nodes
+
+
+class DancingLinks:
+    """
+    Ядро вычисления судоку методом Dancing Links (алгоритм X Кнута).
+
+    Судоку записывается как задача точного покрытия: строка матрицы - значение клетки, столбец -
+    условие (в клетке одно значение, в каждой строке, столбце и малом квадрате каждая цифра
+    встречается один раз). Матрица содержит только условия, не выполненные известными значениями,
+    и только значения клеток, не противоречащие им. Каждый узел матрицы связан с соседями
+    по строке и по столбцу, удаление и возврат столбцов при подборе выполняются изменением связей.
+    Таблицы поля задает аргумент geometry (Geometry), как у ядра BitBoard.
+    """
+
+    def __init__(self, values, geometry=None):
+        # Проверка известных значений выполняется ядром BitBoard
+        board = BitBoard(values, geometry)
+        self.geometry = geometry = board.geometry
+        self.values = board.values
+        unit_values = board.unit_values
+        cells, size = geometry.cells, geometry.size
+
+        # Номера условий: клетка, затем цифра в каждой группе в порядке units
+        conditions = [cell for cell in range(cells) if not self.values[cell]]
+        conditions += [cells + unit * size + digit for unit in range(len(geometry.units)) for digit in range(size)
+                       if not unit_values[unit] >> digit & 1]
+        columns = {condition: number for number, condition in enumerate(conditions, 1)}
+
+        # Узел 0 - заголовок матрицы, узлы 1..len(columns) - заголовки столбцов
+        count = len(columns) + 1
+        self.left = [i - 1 for i in range(count)]
+        self.right = [i + 1 for i in range(count)]
+        self.left[0], self.right[-1] = count - 1, 0
+        self.up = list(range(count))
+        self.down = list(range(count))
+        self.column = list(range(count))
+        self.size = [0] * count
+        # Клетка и значение строки матрицы каждого узла
+        self.row = [None] * count
+        # Количество испробованных при подборе строк матрицы, статистика вычисления (SolveStats)
+        # и ограничения вычисления (Budget)
+        self.nodes = 0
+        self.stats = None
+        self.budget = None
+
+        for cell in range(cells):
+            if self.values[cell]:
+                continue
+            used = 0
+            for unit in geometry.cell_units[cell]:
+                used |= unit_values[unit]
+            for digit in range(size):
+                if not used >> digit & 1:
+                    self._add_row((cell, digit + 1), [columns[cell]] + [columns[cells + unit * size + digit]
+                                                                        for unit in geometry.cell_units[cell]])
+
+    def _add_row(self, row, columns):
+        """ Добавление строки матрицы с узлами в заданных столбцах. """
+
+        first = len(self.column)
+        for number, column in enumerate(columns):
+            node = first + number
+            self.left.append(node - 1 if number else first + len(columns) - 1)
+            self.right.append(node + 1 if number < len(columns) - 1 else first)
+            self.up.append(self.up[column])
+            self.down.append(column)
+            self.down[self.up[column]] = node
+            self.up[column] = node
+            self.column.append(column)
+            self.row.append(row)
+            self.size[column] += 1
+
+    def _cover(self, column):
+        """ Удаление столбца и всех строк, которые его содержат. """
+
+        left, right, up, down, size, column_of = self.left, self.right, self.up, self.down, self.size, self.column
+        right[left[column]] = right[column]
+        left[right[column]] = left[column]
+        i = down[column]
+        while i != column:
+            j = right[i]
+            while j != i:
+                down[up[j]] = down[j]
+                up[down[j]] = up[j]
+                size[column_of[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def _uncover(self, column):
+        """ Возврат столбца и всех строк, которые его содержат, в обратном порядке. """
+
+        left, right, up, down, size, column_of = self.left, self.right, self.up, self.down, self.size, self.column
+        i = up[column]
+        while i != column:
+            j = left[i]
+            while j != i:
+                size[column_of[j]] += 1
+                down[up[j]] = j
+                up[down[j]] = j
+                j = left[j]
+            i = up[i]
+        right[left[column]] = column
+        left[right[column]] = column
+
+    def _choose_column(self):
+        """ Выбор столбца с наименьшим количеством строк. """
+
+        right, size = self.right, self.size
+        best, best_size = 0, None
+        column = right[0]
+        while column:
+            if best_size is None or size[column] < best_size:
+                best, best_size = column, size[column]
+                if best_size < 2:
+                    break
+            column = right[column]
+        return best
+
+    def _search(self):
+        """
+        Подбор строк матрицы, покрывающих все столбцы, с возвратом на явном стеке.
+        Возвращает выбранные строки либо None, если покрытия не существует.
+        """
+
+        right, down, column_of = self.right, self.down, self.column
+        if not right[0]:
+            return []
+        stack = []
+        column = self._choose_column()
+        self._cover(column)
+        node = down[column]
+        while True:
+            if node == column:
+                # Все строки столбца испробованы: возвращаемся к предыдущему выбору
+                self._uncover(column)
+                if not stack:
+                    return None
+                node = stack.pop()
+                if self.stats is not None:
+                    self.stats.backtrack(*self.row[node], len(stack) + 1)
+                j = self.left[node]
+                while j != node:
+                    self._uncover(column_of[j])
+                    j = self.left[j]
+                column = column_of[node]
+                node = down[node]
+                continue
+
+            if self.budget is not None:
+                self.budget.check(self.nodes)
+            stack.append(node)
+            self.nodes += 1
+            if self.stats is not None:
+                self.stats.guess(*self.row[node], len(stack))
+            j = right[node]
+            while j != node:
+                self._cover(column_of[j])
+                j = right[j]
+            if not right[0]:
+                return [self.row[i] for i in stack]
+            column = self._choose_column()
+            self._cover(column)
+            node = down[column]
+
+    def calculate_result(self, stats=None, budget=None):
+        """
+        Метод, решающий судоку. Если передан объект stats (SolveStats), в него записывается
+        статистика подбора строк матрицы. Если передан объект budget (Budget) и подбор превысил
+        его ограничения, возвращается результат BudgetExceeded с известными значениями судоку.
+        При попытке решить судоку, у которого нет верного решения, выбрасывается исключение.
+        """
+
+        self.stats = stats
+        self.budget = budget
+        start = perf_counter()
+        try:
+            rows = self._search()
+        except Budget.Exceeded as error:
+            return budget.result(error.args[0], self.nodes, self.values, self.geometry)
+        finally:
+            if stats is not None:
+                stats.time += perf_counter() - start
+        if rows is None:
+            raise ValueError('судоку не имеет решений')
+        for cell, value in rows:
+            self.values[cell] = value
+        return 'end'
+
+
+# Решенное судоку, на котором проверяются аргументы вычисления
+_SOLVED_GRID = '123456789456789123789123456214365897365897214897214365531642978642978531978531642'
+
+
+def validate_options(**options):
+    """
+    Проверка аргументов Sudoku.calculate_result вычислением решенного судоку: для неверных аргументов
+    выбрасывается исключение ValueError. Переданный объект статистики stats при проверке не изменяется.
+    """
+
+    if options.get('stats') is not None:
+        options['stats'] = SolveStats()
+    Sudoku.from_string(_SOLVED_GRID).calculate_result(**options)
+
+
+def solve_stream(puzzles, engine='bitmask', **options):
+    """
+    Генератор, лениво решающий поток судоку в однострочном формате из 81 символа.
+
+    Возвращает решения в том же формате по одному на каждую непустую строку потока,
+    для судоку с ошибкой в записи или без решения возвращается None. Остальные аргументы
+    передаются в Sudoku.calculate_result.
+    """
+
+    for line in puzzles:
+        line = line.strip()
+        if line:
+            yield _solve_line(line, engine=engine, **options)
+
+
+def _solve_line(line, **options):
+    """ Решение судоку, записанного строкой из 81 символа. Для судоку без решения возвращается None. """
+
+    try:
+        sudoku = Sudoku.from_string(line)
+        if isinstance(sudoku.calculate_result(**options), BudgetExceeded):
+            return None
+    except ValueError:
+        return None
+    return sudoku.to_string()
+
+
+def compare_engines(puzzles, engines=('bitmask', 'dlx'), **options):
+    """
+    Перекрестная проверка ядер вычисления на потоке судоку в однострочном формате из 81 символа.
+
+    Возвращает номер, строку и решения каждого ядра для тех судоку, решения которых различаются.
+    Для судоку с единственным решением все ядра должны давать одинаковый результат.
+    """
+
+    for index, line in enumerate(line.strip() for line in puzzles if line.strip()):
+        solutions = {engine: _solve_line(line, engine=engine, **options) for engine in engines}
+        if len(set(solutions.values())) > 1:
+            yield index, line, solutions
+
+
+# Результат решения одного судоку пакета: порядковый номер, исходная строка, решение и текст ошибки
+SolveResult = namedtuple('SolveResult', ['index', 'puzzle', 'solution', 'error'])
+
+
+def solve_chunk(chunk, options, deadlines=None, chunk_time=None):
+    """
+    Решение части пакета chunk - пар из порядкового номера и строки судоку: список результатов SolveResult
+    в порядке части. Ошибка решения одного судоку сохраняется в его результат и не прерывает пакет.
+    Аргументы options передаются в Sudoku.calculate_result.
+
+    Аргумент deadlines - время в секундах от начала части, до которого должно быть решено каждое судоку
+    (ограничение deadline всех ядер, кроме 'sets'); судоку, время которого истекло до начала вычисления,
+    не решается. Когда часть решается дольше chunk_time секунд, следующие судоку не начинаются,
+    и результатов возвращается меньше, чем судоку в части.
+    """
+
+    start = perf_counter()
+    results = []
+    # Одно судоку на часть пакета: клетки, группы и ядро BitBoard загружаются заново методом reset
+    sudoku = None
+    for number, (index, line) in enumerate(chunk):
+        elapsed = perf_counter() - start
+        if results and chunk_time is not None and elapsed >= chunk_time:
+            break
+        reason = None
+        try:
+            if deadlines is not None and deadlines[number] <= elapsed:
+                reason = 'deadline'
+            else:
+                limits = options
+                if deadlines is not None and options.get('engine') != 'sets':
+                    deadline = deadlines[number] - elapsed
+                    limits = dict(options, deadline=min(deadline, options.get('deadline') or deadline))
+                sudoku = Sudoku.from_string(line) if sudoku is None else sudoku.reset(line)
+                result = sudoku.calculate_result(**limits)
+                if isinstance(result, BudgetExceeded):
+                    reason = result.reason
+        except Exception as error:
+            results.append(SolveResult(index, line, None, str(error) or type(error).__name__))
+        else:
+            if reason is not None:
+                results.append(SolveResult(index, line, None, f'превышено ограничение вычисления: {reason}'))
+            else:
+                results.append(SolveResult(index, line, sudoku.to_string(), None))
+    return results
+
+
+def solve_parallel(puzzles, workers=None, chunk_size=256, ordered=True, engine='bitmask', **options):
+    """
+    Генератор, решающий поток судоку в однострочном формате из 81 символа в пуле процессов.
+
+    Непустые строки потока объединяются в части по chunk_size судоку, которые распределяются
+    между workers процессами (по умолчанию - по числу ядер, при workers=1 пакет решается в текущем
+    процессе). В обработке одновременно находится не больше двух частей на процесс, поэтому поток
+    читается лениво. Результаты SolveResult возвращаются в порядке строк потока, либо, при
+    ordered=False, в порядке готовности. Остальные аргументы передаются в Sudoku.calculate_result.
+    """
+
+    options['engine'] = engine
+    puzzles = enumerate(line.strip() for line in puzzles if line.strip())
+    chunks = iter(lambda: list(islice(puzzles, chunk_size)), [])
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for chunk in chunks:
+            yield from solve_chunk(chunk, options)
+        return
+
+    with ProcessPoolExecutor(workers) as executor:
+        max_pending = workers * 2
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(solve_chunk, chunk, options))
+            while len(pending) >= max_pending:
+                yield from pop_results(pending, ordered)
+        while pending:
+            yield from pop_results(pending, ordered)
+
+
+def percentile(samples, fraction):
+    """ Значение выборки samples с рангом fraction (от 0 до 1) методом ближайшего ранга. """
+
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, int(fraction * len(ordered) + 0.5) - 1))]
+
+
+def pop_results(pending, ordered):
+    """
+    Извлечение результатов части из очереди pending (deque объектов Future) пакетного решения
+    в пуле процессов: первой части очереди (с ожиданием ее готовности) при ordered=True, иначе
+    первой готовой части.
+    """
+
+    if ordered:
+        return pending.popleft().result()
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    future = done.pop()
+    pending.remove(future)
+    return future.result()
+
+
+def _solve_file(file, args, options):
+    """
+    Пакетное решение судоку из файла с записью решений в стандартный вывод построчно, либо
+    перекрестная проверка ядер с выводом различающихся решений. Возвращает код завершения.
+    """
+
+    if args.compare:
+        mismatches = 0
+        for index, line, solutions in compare_engines(file, (args.engine, args.compare), **options):
+            mismatches += 1
+            print(f'судоку {index + 1}: {line}', file=sys.stderr)
+            for engine, solution in solutions.items():
+                print(f'  {engine}: {solution}', file=sys.stderr)
+        return 1 if mismatches else 0
+
+    for result in solve_parallel(file, args.workers or None, args.chunk_size, engine=args.engine, **options):
+        if result.error:
+            print(f'судоку {result.index + 1}: {result.error}', file=sys.stderr)
+        sys.stdout.write((result.solution or '') + '\n')
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='sudoku', description='Решение судоку.')
+    parser.add_argument('file', nargs='?',
+                        help="файл с судоку в однострочном формате из 81 символа, '-' - стандартный ввод; "
+                             "без файла судоку вводится построчно")
+    parser.add_argument('--engine', choices=Sudoku.ENGINES, default='bitmask', help='ядро вычисления')
+    parser.add_argument('--mode', choices=BitBoard.MODES, default='copy', help='режим подбора значений')
+    parser.add_argument('--branching', choices=BitBoard.BRANCHING, default='first', help='правило ветвления')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='количество процессов пакетного режима (0 - по числу ядер)')
+    parser.add_argument('--chunk-size', type=int, default=256, help='количество судоку в одной части пакета')
+    parser.add_argument('--compare', choices=Sudoku.ENGINES,
+                        help='сравнить решения пакета с решениями другого ядра вместо их вывода')
+    parser.add_argument('--strategy', action='append', choices=BitBoard.STRATEGIES, default=[],
+                        help='включить дополнительный алгоритм исключения ядра bitmask (можно повторять)')
+    parser.add_argument('--branch-workers', type=int,
+                        help='параллельный подбор значений одного судоку в нескольких процессах (0 - по числу ядер)')
+    parser.add_argument('--stats', action='store_true', help='вывести статистику алгоритмов (без файла)')
+    parser.add_argument('--box', type=int, choices=Geometry.BOXES, default=3,
+                        help='размер малого квадрата судоку, вводимого построчно (4 - поле 16×16, 5 - 25×25)')
+    args = parser.parse_args(argv)
+    options = {'mode': args.mode, 'branching': args.branching}
+    if args.branch_workers is not None:
+        if args.workers != 1:
+            parser.error('--branch-workers несовместим с --workers')
+        options['branch_workers'] = args.branch_workers
+    if args.strategy:
+        # Планировщик общий для всех судоку пакета (в каждом процессе - для всех судоку его части)
+        options['strategies'] = tuple(args.strategy)
+        options['scheduler'] = StrategyScheduler()
+
+    if args.file is None:
+        a = Sudoku(box=args.box)
+        t1 = perf_counter()
+        a.calculate_result(engine=args.engine, stats=SolveStats() if args.stats else None, **options)
+        print(a)
+        print('Lead time:', perf_counter() - t1)
+        print('Nodes:', a.nodes)
+        if a.stats is not None:
+            for name, strategy in a.stats.strategies.items():
+                print(f'{name}: calls {strategy.calls}, time {strategy.time:.6f}, '
+                      f'eliminations {strategy.eliminations}, assignments {strategy.assignments}')
+            print(f'Guesses: {a.stats.guesses}, backtracks: {a.stats.backtracks}, max depth: {a.stats.max_depth}')
+    elif args.file == '-':
+        return _solve_file(sys.stdin, args, options)
+    else:
+        with open(args.file, encoding='utf-8') as file:
+            return _solve_file(file, args, options)
+    return 0
+
+
 if __name__ == '__main__':
-    a = Sudoku()
-    t1 = perf_counter()
-    a.calculate_result()
-    print(a)
-    print('Lead time:', perf_counter() - t1)
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""
+Модуль измерения производительности решения судоку.
+
+Содержит наборы судоку по уровням сложности (примеры из README, судоку с 17 известными значениями
+и судоку, неудобные для подбора значений), измеряет для каждого ядра и режима вычисления пропускную
+способность, задержки p50/p95/p99 и пиковое потребление памяти, сохраняет результаты в JSON
+и сравнивает их с сохраненными ранее результатами.
+
+Пример использования:
+python -m sudoku_bench --output baseline.json
+python -m sudoku_bench --baseline baseline.json --threshold 0.25
+"""
+
+import argparse
+import json
+import platform
+import sys
+import tracemalloc
+from time import perf_counter
+
+from sudoku import UNITS, Sudoku, percentile
+
+CORPORA = {
+    # Примеры из README
+    'easy': (
+        '....1.37....9.8..1185..3.2.53..7298..498.1.578...496137.3..4..649.1..8.....3.6...',
+        '1.....82..7.1...49..927653132.7.1..6457......9.1..2..3......9.....3.7185.1.829.74',
+    ),
+    'medium': (
+        '6.....8....2.9..4...7.841.....9...6.58.763.29..94.....94......7...6.2.8....54.6.3',
+    ),
+    'hard': (
+        '7....8..19...3.7.55....2...1..9....4..........8...3..7.6...4..3.1..2..4.......25.',
+        '.13........7...9.12.4..7...3..92......68.1...8..4.326.4..68.12.1.2.............46',
+    ),
+    'expert': (
+        '.63.....89.85.........7.........45..83..5..9...961.....5..3.46..........2..1...3.',
+        '....7.4..673.........39.5..3.2.....8..7.1...9...5.2......258.3......7.4.86.......',
+    ),
+    'extreme': (
+        '..53.....8......2..7..1.5..4....53...1..7...6..32...8..6.5....9..4....3......97..',
+        '1....7.9..3..2...8..96..5....53..9...1..8...26....4...3......1..4......7..7...3..',
+        '7.8...3.....2.1...5.........4.....263...8.......1...9..9.6....4....7.5...........',
+        '8..........36......7..9.2...5...7.......457.....1...3...1....68..85...1..9....4..',
+        '.2......48..6...7...1..3....6.75....9....6.5.....9...6.4......17...6..3......82..',
+    ),
+    # Судоку с минимальным количеством известных значений
+    '17clue': (
+        '000000010400000000020000000000050407008000300001090000300400200050100000000806000',
+        '000000010400000000020000000000050604008000300001090000300400200050100000000807000',
+        '000000012000035000000600070700000300000400800100000000000120000080000040050000600',
+        '000000012003600000000007000410020000000500300700000600280000040000300500000000000',
+        '000000012008030000000000040120500000000004700060000000507000300000620000000100000',
+        '6.....8.3.4.7.................5.4.7.3..2.....1.6.......2.....5.....8.6......1....',
+    ),
+    # Судоку, неудобные для подбора значений: первая строка решения 987654321 и Easter Monster
+    'adversarial': (
+        '..............3.85..1.2.......5.7.....4...1...9.......5......73..2.1........4...9',
+        '1.......2.9.4...5...6...7...5.9.3.......7.......85..4.7.....6...3...9.8...2.....1',
+    ),
+}
+
+# Ядра и режимы подбора значений, которые измеряются по умолчанию
+CASES = (('bitmask', 'copy'), ('bitmask', 'trail'), ('dlx', 'copy'))
+
+
+def _check_solution(puzzle, solution):
+    """ Проверка решения: все группы содержат цифры 1-9, известные значения не изменены, решение единственное. """
+
+    if any(sorted(solution[cell] for cell in unit) != list('123456789') for unit in UNITS) or \
+            any(value != result for value, result in zip(puzzle, solution) if value in '123456789'):
+        raise ValueError(f'неверное решение судоку {puzzle}')
+    if not Sudoku.from_string(puzzle).has_unique_solution():
+        raise ValueError(f'судоку {puzzle} имеет больше одного решения')
+
+
+def _solve(puzzle, engine, mode, options):
+    sudoku = Sudoku.from_string(puzzle)
+    sudoku.calculate_result(engine=engine, mode=mode, **options)
+    return sudoku.to_string()
+
+
+def measure(puzzles, engine='bitmask', mode='copy', repeat=5, **options):
+    """
+    Измерение решения судоку puzzles ядром engine в режиме mode: каждое судоку решается repeat раз.
+    Пиковая память измеряется отдельным проходом, чтобы tracemalloc не искажал задержки.
+    Возвращает словарь с количеством решений, пропускной способностью (судоку в секунду),
+    задержками p50/p95/p99 и средней задержкой в миллисекундах и пиковой памятью в байтах.
+    """
+
+    for puzzle in puzzles:
+        _check_solution(puzzle, _solve(puzzle, engine, mode, options))
+
+    samples = []
+    for _ in range(repeat):
+        for puzzle in puzzles:
+            start = perf_counter()
+            _solve(puzzle, engine, mode, options)
+            samples.append(perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        for puzzle in puzzles:
+            _solve(puzzle, engine, mode, options)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'solved': len(samples),
+        'throughput': len(samples) / sum(samples),
+        'mean_ms': sum(samples) / len(samples) * 1000,
+        'p50_ms': percentile(samples, 0.50) * 1000,
+        'p95_ms': percentile(samples, 0.95) * 1000,
+        'p99_ms': percentile(samples, 0.99) * 1000,
+        'peak_bytes': peak,
+    }
+
+
+def run(cases=CASES, tiers=None, repeat=5, **options):
+    """
+    Измерение всех сочетаний ядра и режима cases на наборах tiers (по умолчанию - на всех).
+    Возвращает словарь результатов с ключами вида 'bitmask/copy/first/easy': ядро, режим, правило
+    ветвления (аргумент branching, по умолчанию 'first') и набор.
+    """
+
+    branching = options.get('branching', 'first')
+    results = {}
+    for engine, mode in cases:
+        for tier in tiers or CORPORA:
+            results[f'{engine}/{mode}/{branching}/{tier}'] = measure(CORPORA[tier], engine, mode, repeat, **options)
+    return results
+
+
+def compare(results, baseline, threshold=0.2, metrics=('p50_ms', 'p95_ms', 'p99_ms')):
+    """
+    Сравнение результатов с сохраненными результатами baseline по задержкам metrics. Сравниваются
+    только результаты с одинаковыми ключами, то есть с теми же ядром, режимом и правилом ветвления.
+    Возвращает список замедлений больше чем на долю threshold: (ключ, задержка, было, стало).
+    """
+
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        for metric in metrics:
+            if metric in baseline[key] and result[metric] > baseline[key][metric] * (1 + threshold):
+                regressions.append((key, metric, baseline[key][metric], result[metric]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Измерение производительности решения судоку.')
+    parser.add_argument('--case', action='append', metavar='ENGINE/MODE',
+                        help='ядро и режим подбора значений, например bitmask/trail (по умолчанию - все)')
+    parser.add_argument('--tier', action='append', choices=list(CORPORA),
+                        help='набор судоку (по умолчанию - все)')
+    parser.add_argument('--branching', default='first', help='правило ветвления ядра bitmask')
+    parser.add_argument('--repeat', type=int, default=5, help='количество решений каждого судоку')
+    parser.add_argument('--output', help='файл для сохранения результатов в JSON')
+    parser.add_argument('--baseline', help='файл с сохраненными результатами для сравнения')
+    parser.add_argument('--threshold', type=float, default=0.2, help='допустимое замедление (доля)')
+    args = parser.parse_args(argv)
+
+    cases = [tuple(case.split('/', 1)) if '/' in case else (case, 'copy') for case in args.case] if args.case else CASES
+    results = run(cases, args.tier, args.repeat, branching=args.branching)
+    for key, result in results.items():
+        print(f"{key:<34} {result['throughput']:>10.1f}/s  p50 {result['p50_ms']:8.3f} ms  "
+              f"p95 {result['p95_ms']:8.3f} ms  p99 {result['p99_ms']:8.3f} ms  peak {result['peak_bytes']} B")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump({'python': platform.python_version(), 'repeat': args.repeat, 'results': results}, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)['results']
+        regressions = compare(results, baseline, args.threshold)
+        for key, metric, old, new in regressions:
+            print(f'замедление {key} {metric}: {old:.3f} ms -> {new:.3f} ms', file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,284 @@
+"""
+Модуль двоичного формата судоку: 4 бита на клетку, 41 байт на судоку 9×9.
+
+Файл состоит из заголовка (HEADER: сигнатура, версия, флаги и количество судоку), записей
+по 41 байту и необязательного индекса - номеров строк исходного текстового файла (по 8 байт
+на запись, little-endian). В записи значение клетки 2i хранится в старших 4 битах байта i,
+клетки 2i + 1 - в младших, неизвестное значение - 0; младшие 4 бита последнего байта равны 0.
+Решения записываются в том же формате, судоку без решения - запись из нулей.
+
+PackedReader отображает файл в память (mmap) и возвращает записи как memoryview без копирования,
+PackedWriter записывает судоку или решения и в конце дописывает количество и индекс.
+
+Пример использования:
+python -m sudoku_binary pack puzzles.txt puzzles.sdk --index
+python -m sudoku_binary solve puzzles.sdk solutions.sdk --workers 0
+python -m sudoku_binary unpack solutions.sdk -
+"""
+
+import argparse
+import mmap
+import struct
+import sys
+from array import array
+
+from sudoku import solve_parallel
+
+# Заголовок: сигнатура, версия, флаги, резерв, количество судоку
+HEADER = struct.Struct('<4sBBHQ')
+MAGIC = b'SDKP'
+VERSION = 1
+# Флаг наличия индекса номеров строк исходного файла
+FLAG_INDEX = 1
+RECORD_SIZE = 41
+
+# Символы текстового формата в шестнадцатеричные цифры записи: неизвестные значения - '0'
+_TO_HEX = bytes(byte if 0x31 <= byte <= 0x39 else 0x30 for byte in range(256))
+# Шестнадцатеричные цифры записи в значения клеток
+_TO_VALUES = bytes(byte - 0x30 if 0x30 <= byte <= 0x39 else 0 for byte in range(256))
+
+
+def pack(line):
+    """ Запись судоку из строки из 81 символа (неизвестные значения - 0 или любой символ, кроме цифры) в 41 байт. """
+
+    line = line.strip()
+    if len(line) != 81:
+        raise ValueError('в судоку должно быть 81 значение')
+    return bytes.fromhex(line.encode('ascii', 'replace').translate(_TO_HEX).decode() + '0')
+
+
+def pack_values(values):
+    """ Запись судоку из списка 81 значения (неизвестные значения - 0) в 41 байт. """
+
+    if len(values) != 81:
+        raise ValueError('в судоку должно быть 81 значение')
+    return bytes(values[i] << 4 | (values[i + 1] if i < 80 else 0) for i in range(0, 81, 2))
+
+
+def unpack(record):
+    """ Строка из 81 символа из записи, неизвестные значения обозначаются точкой. """
+
+    return record.hex()[:81].replace('0', '.')
+
+
+def unpack_values(record):
+    """ Список 81 значения из записи, неизвестные значения - 0. """
+
+    return list(record.hex()[:81].encode().translate(_TO_VALUES))
+
+
+class PackedReader:
+    """
+    Чтение файла двоичного формата через отображение в память. Записи возвращаются как memoryview
+    без копирования, пока читатель не закрыт. Поддерживает len, индексацию и перебор записей.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.map)
+        try:
+            if len(self.view) < HEADER.size:
+                raise ValueError('неверный заголовок файла судоку')
+            magic, version, flags, _, self.count = HEADER.unpack_from(self.view)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError('неверный заголовок файла судоку')
+            end = HEADER.size + self.count * RECORD_SIZE
+            index_size = self.count * 8 if flags & FLAG_INDEX else 0
+            if len(self.view) < end + index_size:
+                raise ValueError('файл судоку обрезан')
+            self.records = self.view[HEADER.size:end]
+            self.index = None
+            if flags & FLAG_INDEX:
+                if sys.byteorder == 'little':
+                    self.index = self.view[end:end + index_size].cast('Q')
+                else:
+                    self.index = array('Q', self.view[end:end + index_size])
+                    self.index.byteswap()
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, number):
+        """ Запись номер number (memoryview из 41 байта). """
+
+        if not -self.count <= number < self.count:
+            raise IndexError('номер записи вне файла')
+        number %= self.count
+        return self.records[number * RECORD_SIZE:(number + 1) * RECORD_SIZE]
+
+    def __iter__(self):
+        records = self.records
+        for offset in range(0, self.count * RECORD_SIZE, RECORD_SIZE):
+            yield records[offset:offset + RECORD_SIZE]
+
+    def line_number(self, number):
+        """ Номер строки исходного текстового файла записи number (от 0), если файл содержит индекс. """
+
+        if self.index is None:
+            raise ValueError('файл судоку не содержит индекса')
+        return self.index[number]
+
+    def puzzles(self):
+        """ Генератор строк из 81 символа для solve_stream и solve_parallel. """
+
+        return map(unpack, self)
+
+    def close(self):
+        """
+        Закрытие отображения. Если полученные ранее записи еще используются, отображение
+        закрывается после удаления последней из них.
+        """
+
+        for view in (getattr(self, 'index', None), getattr(self, 'records', None), self.view):
+            if isinstance(view, memoryview):
+                view.release()
+        try:
+            self.map.close()
+        except BufferError:
+            pass
+
+
+class PackedWriter:
+    """
+    Запись файла двоичного формата. Если index=True, для каждой записи сохраняется номер строки
+    исходного файла, который передается в write. Количество записей и индекс записываются при закрытии.
+    """
+
+    def __init__(self, path, index=False):
+        self.file = open(path, 'wb')
+        self.count = 0
+        self.index = array('Q') if index else None
+        self.file.write(HEADER.pack(MAGIC, VERSION, 0, 0, 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, puzzle, line_number=None):
+        """
+        Запись судоку или решения: строки из 81 символа, списка значений или готовой записи из 41 байта.
+        None записывается как запись из нулей (судоку без решения).
+        """
+
+        if puzzle is None:
+            record = bytes(RECORD_SIZE)
+        elif isinstance(puzzle, str):
+            record = pack(puzzle)
+        elif isinstance(puzzle, list):
+            record = pack_values(puzzle)
+        else:
+            record = puzzle
+            if len(record) != RECORD_SIZE:
+                raise ValueError(f'в записи должно быть {RECORD_SIZE} байт')
+        self.file.write(record)
+        if self.index is not None:
+            self.index.append(self.count if line_number is None else line_number)
+        self.count += 1
+
+    def close(self):
+        """ Запись индекса и заголовка с количеством записей, закрытие файла. """
+
+        if self.file.closed:
+            return
+        flags = 0
+        if self.index is not None:
+            flags |= FLAG_INDEX
+            if sys.byteorder != 'little':
+                self.index.byteswap()
+            self.index.tofile(self.file)
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, VERSION, flags, 0, self.count))
+        self.file.close()
+
+
+def pack_text(lines, path, index=False):
+    """
+    Преобразование потока строк текстового формата в файл двоичного формата. Пустые строки
+    и строки с ошибкой в записи пропускаются. Возвращает количество записанных и пропущенных строк.
+    """
+
+    skipped = 0
+    with PackedWriter(path, index) as writer:
+        for number, line in enumerate(lines):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = pack(line)
+            except ValueError:
+                skipped += 1
+                continue
+            writer.write(record, number)
+    return writer.count, skipped
+
+
+def solve_packed(source, target, **options):
+    """
+    Решение судоку файла двоичного формата source с записью решений в файл target того же формата
+    в порядке записей (для судоку без решения - запись из нулей). Индекс source переносится в target.
+    Аргументы options передаются в solve_parallel. Возвращает количество судоку без решения.
+    """
+
+    failed = 0
+    with PackedReader(source) as reader, PackedWriter(target, reader.index is not None) as writer:
+        for result in solve_parallel(reader.puzzles(), **options):
+            failed += not result.solution
+            line_number = reader.index[result.index] if reader.index is not None else None
+            writer.write(result.solution, line_number)
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='sudoku_binary', description='Двоичный формат судоку.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    pack_parser = subparsers.add_parser('pack', help='текстовый формат в двоичный')
+    pack_parser.add_argument('source', help="файл с судоку в однострочном формате, '-' - стандартный ввод")
+    pack_parser.add_argument('target', help='файл двоичного формата')
+    pack_parser.add_argument('--index', action='store_true', help='сохранить номера строк исходного файла')
+    unpack_parser = subparsers.add_parser('unpack', help='двоичный формат в текстовый')
+    unpack_parser.add_argument('source', help='файл двоичного формата')
+    unpack_parser.add_argument('target', help="текстовый файл, '-' - стандартный вывод")
+    solve_parser = subparsers.add_parser('solve', help='решение файла двоичного формата')
+    solve_parser.add_argument('source', help='файл двоичного формата с судоку')
+    solve_parser.add_argument('target', help='файл двоичного формата для решений')
+    solve_parser.add_argument('--engine', default='bitmask', help='ядро вычисления')
+    solve_parser.add_argument('--workers', type=int, default=1, help='количество процессов (0 - по числу ядер)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'pack':
+        if args.source == '-':
+            written, skipped = pack_text(sys.stdin, args.target, args.index)
+        else:
+            with open(args.source, encoding='utf-8') as file:
+                written, skipped = pack_text(file, args.target, args.index)
+        if skipped:
+            print(f'пропущено строк с ошибкой: {skipped}', file=sys.stderr)
+    elif args.command == 'unpack':
+        with PackedReader(args.source) as reader:
+            if args.target == '-':
+                sys.stdout.writelines(line + '\n' for line in reader.puzzles())
+            else:
+                with open(args.target, 'w', encoding='utf-8') as file:
+                    file.writelines(line + '\n' for line in reader.puzzles())
+    else:
+        failed = solve_packed(args.source, args.target, workers=args.workers or None, engine=args.engine)
+        if failed:
+            print(f'судоку без решения: {failed}', file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
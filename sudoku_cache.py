@@ -0,0 +1,271 @@
+"""
+Модуль кэша решений судоку с приведением к каноническому виду.
+
+Судоку, которые отличаются только переименованием цифр, перестановками строк внутри полос,
+перестановками полос, перестановками столбцов внутри вертикальных полос и самих вертикальных
+полос, транспонированием или поворотом, приводятся к одному каноническому виду. Кэш хранит
+решение канонического вида, а решение исходного судоку получается обратным преобразованием.
+
+Пример использования:
+cache = SolutionCache(max_entries=10000)
+solution = cache.solve(line)
+a = Sudoku.from_string(line)
+a.calculate_result(cache=cache)
+"""
+
+import sys
+from collections import OrderedDict
+from itertools import permutations, product
+
+from sudoku import BudgetExceeded, Sudoku, validate_options
+
+# Максимальное количество вариантов расположения строк и столбцов, которые перебираются при приведении
+# к каноническому виду. Судоку с большим количеством равноценных вариантов решаются без кэша.
+MAX_VARIANTS = 4096
+
+
+def _ranks(keys):
+    """ Замена ключей их номерами в отсортированном списке различных ключей. """
+
+    numbers = {key: number for number, key in enumerate(sorted(set(keys)))}
+    return [numbers[key] for key in keys]
+
+
+def _refine(grid, rounds=3):
+    """
+    Вычисление ключей строк и столбцов, которые не зависят от перестановок и переименования цифр:
+    количество известных значений, уточняемое ключами пересекающих строк (столбцов) и количеством
+    повторений цифр известных значений.
+    """
+
+    counts = [grid.count(digit) for digit in range(10)]
+    row_keys = [sum(1 for x in range(9) if grid[y * 9 + x]) for y in range(9)]
+    column_keys = [sum(1 for y in range(9) if grid[y * 9 + x]) for x in range(9)]
+    for _ in range(rounds):
+        new_rows = [(row_keys[y], tuple(sorted((column_keys[x], counts[grid[y * 9 + x]]) for x in range(9) if grid[y * 9 + x])))
+                    for y in range(9)]
+        new_columns = [(column_keys[x], tuple(sorted((row_keys[y], counts[grid[y * 9 + x]]) for y in range(9) if grid[y * 9 + x])))
+                       for x in range(9)]
+        row_keys, column_keys = _ranks(new_rows), _ranks(new_columns)
+    return row_keys, column_keys
+
+
+def _orders(keys):
+    """
+    Все порядки линий (строк или столбцов), при которых полосы упорядочены по ключам своих линий,
+    а линии внутри полосы - по своим ключам. Равные по ключам полосы и линии перебираются во всех порядках.
+    """
+
+    bands = sorted(range(3), key=lambda band: sorted(keys[band * 3:band * 3 + 3]))
+    band_key = [sorted(keys[band * 3:band * 3 + 3]) for band in range(3)]
+    # Порядки полос: перестановки внутри групп полос с равными ключами
+    band_orders = [[]]
+    for group in _groups(bands, band_key):
+        band_orders = [order + list(variant) for order in band_orders for variant in permutations(group)]
+
+    line_orders = {}
+    for band in range(3):
+        lines = sorted(range(band * 3, band * 3 + 3), key=keys.__getitem__)
+        variants = [[]]
+        for group in _groups(lines, keys):
+            variants = [order + list(variant) for order in variants for variant in permutations(group)]
+        line_orders[band] = variants
+
+    return [sum(lines, []) for order in band_orders for lines in product(*(line_orders[band] for band in order))]
+
+
+def _groups(items, keys):
+    """ Разбиение упорядоченных по ключам элементов на группы с равными ключами. """
+
+    groups = []
+    for item in items:
+        if groups and keys[groups[-1][0]] == keys[item]:
+            groups[-1].append(item)
+        else:
+            groups.append([item])
+    return groups
+
+
+def _transpose(grid):
+    return [grid[x * 9 + y] for y in range(9) for x in range(9)]
+
+
+def canonical_form(puzzle):
+    """
+    Приведение судоку, записанного строкой из 81 символа, к каноническому виду.
+
+    Возвращает каноническую строку (неизвестные значения обозначаются нулем) и преобразование
+    (транспонирование, порядок строк, порядок столбцов, переименование цифр), либо None, если
+    равноценных вариантов больше MAX_VARIANTS.
+    """
+
+    grid = [int(value) if value in '123456789' else 0 for value in puzzle]
+    best = None
+    for transpose in (False, True):
+        oriented = _transpose(grid) if transpose else grid
+        row_keys, column_keys = _refine(oriented)
+        row_orders, column_orders = _orders(row_keys), _orders(column_keys)
+        if len(row_orders) * len(column_orders) > MAX_VARIANTS:
+            return None
+        for rows in row_orders:
+            for columns in column_orders:
+                # Цифры переименовываются в порядке их первого появления
+                relabel = {}
+                values = []
+                for y in rows:
+                    line = y * 9
+                    for x in columns:
+                        value = oriented[line + x]
+                        if value:
+                            value = relabel.setdefault(value, len(relabel) + 1)
+                        values.append(value)
+                if best is None or values < best[0]:
+                    best = values, (transpose, rows, columns, relabel)
+
+    values, (transpose, rows, columns, relabel) = best
+    # Цифры, которых нет в судоку, получают оставшиеся номера по возрастанию
+    free = iter(digit for digit in range(1, 10) if digit not in relabel.values())
+    for digit in range(1, 10):
+        if digit not in relabel:
+            relabel[digit] = next(free)
+    return ''.join(map(str, values)), (transpose, rows, columns, relabel)
+
+
+def to_canonical(solution, transform):
+    """ Преобразование решения исходного судоку в решение канонического вида. """
+
+    transpose, rows, columns, relabel = transform
+    grid = [int(value) for value in solution]
+    if transpose:
+        grid = _transpose(grid)
+    return ''.join(str(relabel[grid[y * 9 + x]]) for y in rows for x in columns)
+
+
+def from_canonical(solution, transform):
+    """ Преобразование решения канонического вида в решение исходного судоку. """
+
+    transpose, rows, columns, relabel = transform
+    inverse = {new: old for old, new in relabel.items()}
+    grid = [0] * 81
+    values = iter(solution)
+    for y in rows:
+        for x in columns:
+            grid[y * 9 + x] = inverse[int(next(values))]
+    if transpose:
+        grid = _transpose(grid)
+    return ''.join(map(str, grid))
+
+
+class SolutionCache:
+    """
+    Кэш решений судоку, приведенных к каноническому виду, с вытеснением давно не использованных записей
+    при превышении количества записей max_entries или их размера в байтах max_bytes.
+
+    Хранит статистику: попадания, промахи, вытеснения и судоку, решенные без кэша.
+    """
+
+    def __init__(self, max_entries=100000, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bypasses = 0
+        # Проверенные сочетания аргументов вычисления (см. _check_options)
+        self.checked = set()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        """ Статистика кэша. """
+
+        return {'entries': len(self.entries), 'bytes': self.bytes, 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'bypasses': self.bypasses}
+
+    def clear(self):
+        """ Удаление всех записей кэша. """
+
+        self.entries.clear()
+        self.bytes = 0
+
+    def _check_options(self, options):
+        """
+        Проверка аргументов вычисления validate_options. Сочетание запоминается по строкам и кортежам
+        аргументов и типам остальных значений (ограничений, статистики, планировщика), поэтому
+        повторная проверка того же сочетания не решает судоку.
+        """
+
+        signature = tuple(sorted((name, tuple(value) if isinstance(value, list) else
+                                  value if isinstance(value, (str, tuple)) else type(value))
+                                 for name, value in options.items()))
+        try:
+            if signature in self.checked:
+                return
+        except TypeError:
+            signature = None
+        validate_options(**options)
+        if signature is not None:
+            self.checked.add(signature)
+
+    def _get(self, key):
+        """ Поиск записи с обновлением ее положения в очереди вытеснения. Отсутствие записи - KeyError. """
+
+        solution = self.entries[key]
+        self.entries.move_to_end(key)
+        return solution
+
+    def _put(self, key, solution):
+        """ Добавление записи с вытеснением давно не использованных записей. """
+
+        size = sys.getsizeof(key) + sys.getsizeof(solution)
+        if size > self.max_bytes or self.max_entries < 1:
+            return
+        self.entries[key] = solution
+        self.bytes += size
+        while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+            old_key, old_solution = self.entries.popitem(last=False)
+            self.bytes -= sys.getsizeof(old_key) + sys.getsizeof(old_solution)
+            self.evictions += 1
+
+    def solve(self, puzzle, **options):
+        """
+        Решение судоку, записанного строкой из 81 символа, с использованием кэша. Остальные аргументы
+        передаются в Sudoku.calculate_result при промахе и проверяются при каждом вызове, поэтому
+        неверные аргументы выбрасывают исключение независимо от содержимого кэша. Возвращает решение
+        строкой из 81 цифры либо результат BudgetExceeded, если вычисление прервано ограничением
+        (он не сохраняется в кэш), для судоку без решения выбрасывается исключение.
+        """
+
+        self._check_options(options)
+        puzzle = puzzle.strip()
+        sudoku = Sudoku.from_string(puzzle)
+        canonical = canonical_form(puzzle)
+        if canonical is None:
+            self.bypasses += 1
+            result = sudoku.calculate_result(**options)
+            return result if isinstance(result, BudgetExceeded) else sudoku.to_string()
+
+        key, transform = canonical
+        try:
+            solution = self._get(key)
+        except KeyError:
+            self.misses += 1
+            try:
+                result = sudoku.calculate_result(**options)
+            except ValueError:
+                # Аргументы уже проверены: ошибка означает, что у судоку нет решения
+                self._put(key, None)
+                raise
+            if isinstance(result, BudgetExceeded):
+                return result
+            solution = to_canonical(sudoku.to_string(), transform)
+            self._put(key, solution)
+        else:
+            self.hits += 1
+
+        if solution is None:
+            raise ValueError('судоку не имеет решений')
+        return from_canonical(solution, transform)
@@ -0,0 +1,136 @@
+"""
+Модуль генерации судоку с единственным решением.
+
+Генератор строит случайное заполненное поле подбором значений ядра BitBoard в случайном порядке,
+затем в случайном порядке убирает известные значения (группами клеток, если задана симметрия),
+оставляя удаление только тогда, когда решение остается единственным. Проверка единственности
+сначала выполняет алгоритмы исключения, и большинство удалений подтверждается без подбора значений.
+
+Генерация воспроизводима: каждое судоку строится своим генератором случайных чисел, зависящим
+от seed и номера судоку, поэтому результат не зависит от количества процессов.
+
+Пример использования:
+python -m sudoku_generator --count 1000 --clues 26 --symmetry rotational --seed 1 --workers 0 > puzzles.txt
+"""
+
+import argparse
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from sudoku import MASK_DIGITS, POPCOUNT, BitBoard
+
+# Группы клеток, которые убираются одновременно для получения симметричного судоку
+SYMMETRIES = {
+    'none': lambda cell: (cell,),
+    # Поворот на 180 градусов
+    'rotational': lambda cell: (cell, 80 - cell),
+    # Отражение относительно главной диагонали
+    'diagonal': lambda cell: (cell, cell % 9 * 9 + cell // 9),
+    # Отражение относительно вертикальной оси
+    'mirror': lambda cell: (cell, cell // 9 * 9 + 8 - cell % 9),
+}
+
+
+def _random_branch(rng, board):
+    """ Правило ветвления: клетка с наименьшим количеством возможных значений, значения в случайном порядке. """
+
+    values, options = board.values, board.options
+    cell = min((cell for cell in range(81) if not values[cell]), key=lambda cell: POPCOUNT[options[cell]])
+    variants = [(cell, value) for value in MASK_DIGITS[options[cell]]]
+    rng.shuffle(variants)
+    return variants
+
+
+def random_grid(rng):
+    """ Случайное заполненное поле: список из 81 значения. """
+
+    board = BitBoard([0] * 81)
+    board.calculate_result('trail', partial(_random_branch, rng))
+    return board.values
+
+
+def _is_unique(board, values):
+    """ Проверка единственности решения судоку, заданного списком значений, на повторно используемом ядре board. """
+
+    return board.reset(values).count_solutions(2) == 1
+
+
+def generate(rng, clues=None, symmetry='none'):
+    """
+    Генерация судоку с единственным решением. Известные значения убираются, пока их больше clues
+    (по умолчанию - пока удаление возможно). Если заданное количество недостижимо для полученного
+    поля, возвращается судоку с наименьшим найденным количеством известных значений.
+    Возвращает судоку и решение строками из 81 символа, неизвестные значения обозначаются точкой.
+    """
+
+    if symmetry not in SYMMETRIES:
+        raise ValueError(f'неизвестная симметрия: {symmetry}')
+    orbit = SYMMETRIES[symmetry]
+    solution = random_grid(rng)
+    values = solution.copy()
+    count = 81
+    board = BitBoard(values)
+
+    cells = list(range(81))
+    rng.shuffle(cells)
+    for cell in cells:
+        if clues is not None and count <= clues:
+            break
+        group = [other for other in set(orbit(cell)) if values[other]]
+        if not group:
+            continue
+        for other in group:
+            values[other] = 0
+        if _is_unique(board, values):
+            count -= len(group)
+        else:
+            for other in group:
+                values[other] = solution[other]
+
+    return (''.join(str(value) if value else '.' for value in values),
+            ''.join(map(str, solution)))
+
+
+def _generate_one(index, seed, clues, symmetry):
+    """ Генерация судоку номер index генератором случайных чисел, зависящим от seed и index. """
+
+    return generate(random.Random(f'{seed}:{index}'), clues, symmetry)
+
+
+def generate_many(count, seed=0, clues=None, symmetry='none', workers=1, chunk_size=16):
+    """
+    Генератор, возвращающий count судоку с единственным решением в порядке их номеров.
+    При workers больше 1 судоку генерируются в нескольких процессах (None - по числу ядер).
+    Возвращает пары (судоку, решение) строками из 81 символа.
+    """
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    task = partial(_generate_one, seed=seed, clues=clues, symmetry=symmetry)
+    if workers == 1:
+        yield from map(task, range(count))
+        return
+    with ProcessPoolExecutor(workers) as executor:
+        yield from executor.map(task, range(count), chunksize=chunk_size)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='sudoku_generator', description='Генерация судоку с единственным решением.')
+    parser.add_argument('--count', type=int, default=1, help='количество судоку')
+    parser.add_argument('--seed', default='0', help='начальное значение генератора случайных чисел')
+    parser.add_argument('--clues', type=int, help='желаемое количество известных значений')
+    parser.add_argument('--symmetry', choices=list(SYMMETRIES), default='none', help='симметрия известных значений')
+    parser.add_argument('--workers', type=int, default=1, help='количество процессов (0 - по числу ядер)')
+    parser.add_argument('--solutions', action='store_true', help='выводить решение после каждого судоку')
+    args = parser.parse_args(argv)
+
+    for puzzle, solution in generate_many(args.count, args.seed, args.clues, args.symmetry, args.workers or None):
+        print(f'{puzzle} {solution}' if args.solutions else puzzle)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+Модуль оценки сложности судоку.
+
+Сложность определяется самым сложным приемом, без которого судоку не решается (BitBoard.grade):
+одиночки, пересечения, открытые группы, рыбы, скрытые группы, XY-Wing и XYZ-Wing, а если их
+недостаточно - количеством вариантов подбора значений. Поток судоку оценивается частями
+в нескольких процессах.
+
+Пример использования:
+python -m sudoku_grade puzzles.txt --workers 0 > grades.txt
+python -m sudoku_grade puzzles.txt --workers 0 --summary
+"""
+
+import argparse
+import os
+import sys
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from sudoku import BitBoard, Geometry, pop_results
+
+# Повторно используемые ядра BitBoard процесса по размеру малого квадрата
+_boards = {}
+
+
+def grade_line(line):
+    """ Оценка сложности судоку, записанного строкой (Grade). Для судоку с ошибкой в записи или без решения - None. """
+
+    line = line.strip()
+    try:
+        geometry = Geometry.from_length(len(line))
+        if geometry.box > 3:
+            line = line.upper()
+        digits = geometry.digits
+        values = [digits.get(value, 0) for value in line]
+        board = _boards.get(geometry.box)
+        if board is None:
+            board = _boards[geometry.box] = BitBoard(values, geometry)
+        else:
+            board.reset(values)
+        return board.grade()
+    except ValueError:
+        return None
+
+
+def _grade_chunk(chunk):
+    """ Оценка сложности части потока: список оценок Grade (или None) в порядке судоку части. """
+
+    return [grade_line(line) for line in chunk]
+
+
+def grade_many(puzzles, workers=1, chunk_size=1024):
+    """
+    Генератор оценок сложности (Grade или None) потока судоку в порядке его непустых строк.
+    Части по chunk_size судоку распределяются между workers процессами (None - по числу ядер).
+    В обработке одновременно находится не больше двух частей на процесс, поэтому поток читается лениво.
+    """
+
+    puzzles = (line for line in puzzles if line.strip())
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        yield from map(grade_line, puzzles)
+        return
+
+    chunks = iter(lambda: list(islice(puzzles, chunk_size)), [])
+    with ProcessPoolExecutor(workers) as executor:
+        max_pending = workers * 2
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_grade_chunk, chunk))
+            while len(pending) >= max_pending:
+                yield from pop_results(pending, ordered=True)
+        while pending:
+            yield from pop_results(pending, ordered=True)
+
+
+def _print_grades(file, args):
+    """ Вывод оценок судоку файла построчно либо количества судоку по самому сложному приему. """
+
+    techniques = Counter()
+    for grade in grade_many(file, args.workers or None, args.chunk_size):
+        if args.summary:
+            techniques[grade.technique if grade is not None else 'error'] += 1
+        elif grade is None:
+            print('error')
+        else:
+            print(f'{grade.score} {grade.technique} {grade.guesses}')
+    if args.summary:
+        for name in [name for name, _ in BitBoard.TECHNIQUES] + ['guess', 'error']:
+            if techniques[name]:
+                print(f'{name}: {techniques[name]}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='sudoku_grade', description='Оценка сложности судоку.')
+    parser.add_argument('file', help="файл с судоку в однострочном формате, '-' - стандартный ввод")
+    parser.add_argument('--workers', type=int, default=1, help='количество процессов (0 - по числу ядер)')
+    parser.add_argument('--chunk-size', type=int, default=1024, help='количество судоку в одной части')
+    parser.add_argument('--summary', action='store_true',
+                        help='вывести количество судоку по самому сложному приему вместо оценок')
+    args = parser.parse_args(argv)
+
+    if args.file == '-':
+        _print_grades(sys.stdin, args)
+    else:
+        with open(args.file, encoding='utf-8') as file:
+            _print_grades(file, args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
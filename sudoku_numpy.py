@@ -0,0 +1,164 @@
+"""
+Модуль пакетного вычисления судоку на NumPy.
+
+Класс BoardBatch хранит N судоку в виде массива битовых масок возможных значений размера (N, 81)
+и выполняет алгоритмы update_value_options и _search_unique_value сразу для всех судоку пакета
+векторными операциями. Судоку, вычисление которых остановилось, решаются подбором значений
+методом Sudoku.calculate_result.
+
+Для работы модуля требуется NumPy, модуль sudoku от него не зависит.
+"""
+
+from itertools import islice
+
+import numpy as np
+
+from sudoku import CELL_UNITS, LOWEST_BIT, POPCOUNT, UNITS, BudgetExceeded, Sudoku
+
+# Клетки каждой группы и номера групп каждой клетки
+UNIT_CELLS = np.array(UNITS, dtype=np.intp)
+CELL_GROUPS = np.array(CELL_UNITS, dtype=np.intp)
+# Маска цифры (для 0 - пустая маска) и сдвиги битов всех цифр
+DIGIT_BITS = np.array([0] + [1 << (d - 1) for d in range(1, 10)], dtype=np.uint16)
+DIGIT_SHIFTS = np.arange(9, dtype=np.uint16)
+POPCOUNT_TABLE = np.array(POPCOUNT, dtype=np.uint8)
+LOWEST_BIT_TABLE = np.array(LOWEST_BIT, dtype=np.uint8)
+
+
+class BoardBatch:
+    """
+    Класс, содержащий пакет судоку: известные значения клеток (N, 81), маски их возможных значений (N, 81)
+    и состояние каждого судоку пакета - решено, остановлено или не имеет решений.
+    """
+
+    def __init__(self, puzzles):
+        self.puzzles = [line.strip() for line in puzzles]
+        for line in self.puzzles:
+            if len(line) != 81:
+                raise ValueError('в судоку должно быть 81 значение')
+        text = np.frombuffer(''.join(self.puzzles).encode('ascii', 'replace'), dtype=np.uint8).reshape(-1, 81)
+        self.values = np.where((text >= ord('1')) & (text <= ord('9')), text - ord('0'), 0).astype(np.uint8)
+        self.options = np.where(self.values, 0, 0b111111111).astype(np.uint16)
+        self.invalid = np.zeros(len(self.puzzles), dtype=bool)
+
+    def __len__(self):
+        return len(self.puzzles)
+
+    @property
+    def solved(self):
+        """ Маска судоку пакета, у которых известны значения всех клеток. """
+
+        return ~self.invalid & (self.values != 0).all(axis=1)
+
+    def update_value_options(self, boards):
+        """
+        Вычисляет возможные значения клеток судоку boards и устанавливает значения клеток,
+        у которых осталось одно возможное значение. Возвращает маску судоку, в которых были изменения.
+        """
+
+        values = self.values[boards]
+        options = self.options[boards]
+        # Известные значения каждой группы; повтор значения в группе означает, что решения нет
+        unit_values = np.bitwise_or.reduce(DIGIT_BITS[values][:, UNIT_CELLS], axis=2)
+        invalid = (POPCOUNT_TABLE[unit_values].sum(axis=1) != (values[:, UNIT_CELLS] != 0).sum(axis=(1, 2)))
+
+        new_options = options & ~np.bitwise_or.reduce(unit_values[:, CELL_GROUPS], axis=2)
+        unknown = values == 0
+        invalid |= (unknown & (new_options == 0)).any(axis=1)
+        singles = unknown & (POPCOUNT_TABLE[new_options] == 1)
+        values[singles] = LOWEST_BIT_TABLE[new_options[singles]]
+        new_options[singles] = 0
+
+        changed = (new_options != options).any(axis=1)
+        self.values[boards] = values
+        self.options[boards] = new_options
+        self.invalid[boards] |= invalid
+        return changed & ~invalid
+
+    def _search_unique_value(self, boards):
+        """
+        Поиск во всех группах судоку boards значений, возможных только в одной клетке группы,
+        и установка этих значений. Возвращает маску судоку, в которых были изменения.
+        """
+
+        values = self.values[boards]
+        # Возможные значения без значений, установленных на текущем проходе
+        unit_values = np.bitwise_or.reduce(DIGIT_BITS[values][:, UNIT_CELLS], axis=2)
+        options = self.options[boards] & ~np.bitwise_or.reduce(unit_values[:, CELL_GROUPS], axis=2)
+        # Признак наличия каждой цифры в возможных значениях каждой клетки группы: (N, 27, 9 клеток, 9 цифр)
+        digit_cells = ((options[:, UNIT_CELLS][..., None] >> DIGIT_SHIFTS) & 1).astype(np.uint8)
+        board, unit, digit = np.nonzero(digit_cells.sum(axis=2) == 1)
+        cells = UNIT_CELLS[unit, digit_cells.argmax(axis=2)[board, unit, digit]]
+
+        # Одна клетка может получить разные уникальные значения в разных группах, тогда решения нет
+        found = np.zeros(options.shape, dtype=np.uint16)
+        np.bitwise_or.at(found, (board, cells), DIGIT_BITS[digit + 1])
+        invalid = (POPCOUNT_TABLE[found] > 1).any(axis=1)
+        assigned = found != 0
+        values[assigned] = LOWEST_BIT_TABLE[found[assigned]]
+        options[assigned] = 0
+
+        self.values[boards] = values
+        self.options[boards] = options
+        self.invalid[boards] |= invalid
+        return assigned.any(axis=1) & ~invalid
+
+    def calculate_unknown_cells(self):
+        """
+        Вычисление неизвестных значений клеток всех судоку пакета до тех пор,
+        пока хотя бы в одном судоку происходят изменения.
+        """
+
+        boards = np.arange(len(self))
+        while boards.size:
+            changed = self.update_value_options(boards)
+            changed |= self._search_unique_value(boards)
+            # Судоку без изменений на проходе уже проверены на повторы значений в группах
+            boards = boards[changed]
+
+    def to_strings(self):
+        """ Запись судоку пакета в строки из 81 символа, неизвестные значения обозначаются нулем. """
+
+        text = (self.values + ord('0')).astype(np.uint8)
+        return [row.tobytes().decode('ascii') for row in text]
+
+    def calculate_result(self, engine='bitmask', **options):
+        """
+        Вычисление пакета: алгоритмы исключения выполняются для всех судоку сразу, а остановившиеся
+        судоку решаются методом Sudoku.calculate_result с аргументами options. Возвращает список
+        решений в формате строк из 81 символа, для судоку без решения или вычисление которых прервано
+        ограничением (BudgetExceeded) - None.
+        """
+
+        self.calculate_unknown_cells()
+        solved = self.solved
+        results = []
+        for number, line in enumerate(self.to_strings()):
+            if self.invalid[number]:
+                results.append(None)
+            elif solved[number]:
+                results.append(line)
+            else:
+                sudoku = Sudoku.from_string(line)
+                try:
+                    result = sudoku.calculate_result(engine=engine, **options)
+                except ValueError:
+                    results.append(None)
+                else:
+                    results.append(None if isinstance(result, BudgetExceeded) else sudoku.to_string())
+        return results
+
+
+def solve_batch(puzzles, batch_size=4096, engine='bitmask', **options):
+    """
+    Генератор, решающий поток судоку в однострочном формате из 81 символа пакетами по batch_size судоку.
+    Возвращает решения по одному на каждую непустую строку потока, для судоку с ошибкой в записи
+    или без решения возвращается None. Остальные аргументы передаются в Sudoku.calculate_result.
+    """
+
+    puzzles = (line.strip() for line in puzzles if line.strip())
+    for chunk in iter(lambda: list(islice(puzzles, batch_size)), []):
+        valid = [line for line in chunk if len(line) == 81]
+        solutions = iter(BoardBatch(valid).calculate_result(engine, **options) if valid else [])
+        for line in chunk:
+            yield next(solutions) if len(line) == 81 else None
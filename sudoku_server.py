@@ -0,0 +1,284 @@
+"""
+Модуль локального сервера решения судоку на asyncio.
+
+Сервер принимает TCP-соединения, каждая строка запроса - судоку из 81 символа и, через пробел,
+необязательный таймаут в секундах. На каждую строку в том же порядке отправляется строка
+ответа: решение из 81 цифры либо 'error: <описание>'. Строка METRICS возвращает метрики
+сервера в формате JSON: глубину очереди, задержки и пропускную способность.
+
+Запросы всех соединений объединяются в части, которые решаются в пуле процессов, поэтому
+сложное судоку не останавливает цикл событий, а часть, которая решается слишком долго, возвращает
+готовые результаты, не начиная оставшиеся судоку. Количество принятых, но еще не решенных
+судоку ограничено: при заполнении очереди сервер перестает читать запросы, пока она не освободится.
+
+Пример использования:
+python -m sudoku_server --port 8765 --workers 0
+printf '%s\\nMETRICS\\n' "$PUZZLE" | nc 127.0.0.1 8765
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_all_start_methods, get_context
+from time import perf_counter
+
+from sudoku import SolveResult, percentile, solve_chunk
+
+
+class SolveServer:
+    """
+    Сервер решения судоку: очередь запросов, пакетная отправка частей в пул из workers процессов
+    и метрики. Аргументы options передаются в Sudoku.calculate_result.
+
+    Запросы ожидают batch_delay секунд, чтобы собраться в часть из не более чем chunk_size судоку.
+    Часть, решаемая дольше chunk_time секунд (None - без ограничения), не начинает следующие судоку,
+    и они отправляются в пул новой частью. Одновременно принято не больше max_pending судоку,
+    в пуле - не больше двух частей на процесс.
+    Запрос, не решенный за timeout секунд, получает ответ об ошибке.
+    """
+
+    def __init__(self, workers=None, chunk_size=32, batch_delay=0.002, max_pending=1024, timeout=10.0,
+                 chunk_time=1.0, **options):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.chunk_time = chunk_time
+        self.batch_delay = batch_delay
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.options = options
+        options.setdefault('engine', 'bitmask')
+        self.executor = None
+        self.queue = None
+        self.slots = None
+        self.chunk_slots = None
+        self.tasks = set()
+        # Метрики
+        self.started = perf_counter()
+        self.pending = 0
+        self.requests = 0
+        self.solved = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.latencies = deque(maxlen=10000)
+
+    async def start(self, host='127.0.0.1', port=8765):
+        """ Запуск пула процессов, отправки частей и приема соединений. Возвращает asyncio.Server. """
+
+        # Процессы пула создаются по мере необходимости; при fork они унаследовали бы сокеты
+        # открытых соединений, и закрытие соединения сервером не доходило бы до клиента
+        method = 'forkserver' if 'forkserver' in get_all_start_methods() else 'spawn'
+        self.executor = ProcessPoolExecutor(self.workers, mp_context=get_context(method))
+        self.queue = asyncio.Queue()
+        self.slots = asyncio.Semaphore(self.max_pending)
+        self.chunk_slots = asyncio.Semaphore(self.workers * 2)
+        self.started = perf_counter()
+        self._spawn(self._dispatch())
+        return await asyncio.start_server(self._handle, host, port)
+
+    async def close(self):
+        """ Остановка отправки частей и пула процессов. """
+
+        for task in list(self.tasks):
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _spawn(self, coroutine):
+        """ Запуск задачи с сохранением ссылки на нее до завершения. """
+
+        task = asyncio.ensure_future(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def solve(self, puzzle, timeout=None):
+        """
+        Решение судоку, записанного строкой из 81 символа. Ожидает свободного места в очереди,
+        возвращает SolveResult; если решение не получено за timeout секунд (по умолчанию - таймаут
+        сервера), выбрасывается asyncio.TimeoutError.
+        """
+
+        await self._accept()
+        return await self._submit(puzzle, timeout)
+
+    async def _accept(self):
+        """ Ожидание свободного места в очереди и учет принятого запроса. """
+
+        await self.slots.acquire()
+        self.pending += 1
+        self.requests += 1
+
+    async def _submit(self, puzzle, timeout):
+        """ Постановка принятого судоку в очередь и ожидание результата. """
+
+        future = asyncio.get_running_loop().create_future()
+        if timeout is None:
+            timeout = self.timeout
+        self.queue.put_nowait((puzzle, future, perf_counter(), timeout))
+        try:
+            # Судоку, не решенное за таймаут запроса, прерывается и в процессе пула, но место в очереди
+            # освобождается, только когда часть вернет результат
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+
+    async def _dispatch(self):
+        """ Сбор запросов из очереди в части и отправка их в пул процессов. """
+
+        while True:
+            chunk = [await self.queue.get()]
+            if self.batch_delay:
+                await asyncio.sleep(self.batch_delay)
+            while len(chunk) < self.chunk_size and not self.queue.empty():
+                chunk.append(self.queue.get_nowait())
+            await self.chunk_slots.acquire()
+            self._spawn(self._run_chunk(chunk))
+
+    async def _run_chunk(self, chunk):
+        """
+        Решение части в пуле процессов и передача результатов ожидающим запросам. Судоку, которые
+        часть не начала за chunk_time секунд, отправляются в пул следующей частью.
+        """
+
+        # Процессу пула передается время, оставшееся до таймаута каждого запроса
+        now = perf_counter()
+        lines = [(index, puzzle) for index, (puzzle, _, _, _) in enumerate(chunk)]
+        deadlines = [timeout - (now - start) for _, _, start, timeout in chunk]
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self.executor, solve_chunk, lines, self.options, deadlines, self.chunk_time)
+        except Exception as error:
+            results = [SolveResult(index, puzzle, None, str(error) or type(error).__name__) for index, puzzle in lines]
+        finally:
+            self.chunk_slots.release()
+
+        now = perf_counter()
+        for (_, future, start, _), result in zip(chunk, results):
+            self.latencies.append(now - start)
+            if result.error:
+                self.errors += 1
+            else:
+                self.solved += 1
+            if not future.done():
+                future.set_result(result)
+            self.pending -= 1
+            self.slots.release()
+
+        if len(results) < len(chunk):
+            await self.chunk_slots.acquire()
+            self._spawn(self._run_chunk(chunk[len(results):]))
+
+    def metrics(self):
+        """ Метрики сервера: очередь, счетчики запросов, пропускная способность и задержки в миллисекундах. """
+
+        uptime = perf_counter() - self.started
+        latencies = list(self.latencies)
+        result = {
+            'pending': self.pending,
+            'queued': self.queue.qsize() if self.queue else 0,
+            'requests': self.requests,
+            'solved': self.solved,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'uptime': uptime,
+            'throughput': (self.solved + self.errors) / uptime if uptime else 0.0,
+        }
+        if latencies:
+            result.update({f'p{rank}_ms': percentile(latencies, rank / 100) * 1000 for rank in (50, 95, 99)})
+        return result
+
+    async def _respond(self, puzzle, timeout):
+        """ Строка ответа на запрос решения. """
+
+        try:
+            result = await self._submit(puzzle, timeout)
+        except asyncio.TimeoutError:
+            return 'error: timeout'
+        return result.solution if result.solution else f'error: {result.error}'
+
+    async def _handle(self, reader, writer):
+        """ Чтение запросов соединения и отправка ответов в порядке запросов. """
+
+        responses = asyncio.Queue()
+        sender = self._spawn(self._send(responses, writer))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request = line.decode('ascii', 'replace').split()
+                if not request:
+                    continue
+                if request[0].upper() == 'METRICS':
+                    responses.put_nowait(json.dumps(self.metrics()))
+                    continue
+                try:
+                    timeout = float(request[1]) if len(request) > 1 else None
+                except ValueError:
+                    responses.put_nowait('error: неверный таймаут')
+                    continue
+                # Пока очередь заполнена, следующие запросы соединения не читаются
+                await self._accept()
+                responses.put_nowait(self._spawn(self._respond(request[0], timeout)))
+        finally:
+            responses.put_nowait(None)
+            await sender
+
+    @staticmethod
+    async def _send(responses, writer):
+        """ Отправка ответов соединения по мере готовности в порядке запросов. """
+
+        try:
+            while (response := await responses.get()) is not None:
+                if not isinstance(response, str):
+                    response = await response
+                writer.write(response.encode('utf-8') + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host='127.0.0.1', port=8765, **kwargs):
+    """ Запуск сервера и обработка соединений до остановки. Аргументы kwargs передаются в SolveServer. """
+
+    solver = SolveServer(**kwargs)
+    server = await solver.start(host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await solver.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='sudoku_server', description='Локальный сервер решения судоку.')
+    parser.add_argument('--host', default='127.0.0.1', help='адрес сервера')
+    parser.add_argument('--port', type=int, default=8765, help='порт сервера')
+    parser.add_argument('--workers', type=int, default=0, help='количество процессов (0 - по числу ядер)')
+    parser.add_argument('--chunk-size', type=int, default=32, help='наибольшее количество судоку в части')
+    parser.add_argument('--batch-delay', type=float, default=0.002, help='время сбора части в секундах')
+    parser.add_argument('--max-pending', type=int, default=1024, help='наибольшее количество принятых судоку')
+    parser.add_argument('--timeout', type=float, default=10.0, help='таймаут запроса в секундах')
+    parser.add_argument('--chunk-time', type=float, default=1.0,
+                        help='время, после которого часть не начинает следующие судоку, в секундах')
+    parser.add_argument('--engine', default='bitmask', help='ядро вычисления')
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(args.host, args.port, workers=args.workers or None, chunk_size=args.chunk_size,
+                          batch_delay=args.batch_delay, max_pending=args.max_pending, timeout=args.timeout,
+                          chunk_time=args.chunk_time, engine=args.engine))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,305 @@
+"""
+Модуль постоянного хранилища результатов решения судоку на SQLite.
+
+Результат каждого судоку хранится по ключу - хэшу SHA-256 его записи, в которой неизвестные значения
+обозначены точкой: состояние ('solved', 'no_solution', 'budget_exceeded' или 'invalid'), решение,
+количество испробованных вариантов, время вычисления и, по запросу, статистика алгоритмов (SolveStats).
+Записи сохраняются частями в транзакциях, поэтому после сбоя в хранилище остаются все результаты
+завершенных транзакций, а повторный запуск пакета пропускает уже решенные судоку. Хранилище
+в режиме только для чтения можно одновременно открыть в нескольких процессах.
+
+Пример использования:
+python -m sudoku_store run puzzles.txt results.db --workers 0 --deadline 10
+python -m sudoku_store export results.db puzzles.txt > solutions.txt
+python -m sudoku_store get results.db 7.8...3.....2.1...5.........4.....263...8.......1...9..9.6....4....7.5...........
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from time import perf_counter
+
+from sudoku import BudgetExceeded, Geometry, SolveStats, Sudoku, pop_results, validate_options
+
+# Состояния результата
+STATUSES = ('solved', 'no_solution', 'budget_exceeded', 'invalid')
+
+# Результат решения одного судоку: ключ, исходная строка, состояние, решение (None, если его нет),
+# количество испробованных вариантов, время вычисления в секундах, статистика (словарь SolveStats.as_dict
+# или None) и текст ошибки
+StoredResult = namedtuple('StoredResult', ['key', 'puzzle', 'status', 'solution', 'nodes', 'elapsed', 'stats',
+                                           'error'])
+
+
+def puzzle_key(puzzle):
+    """ Ключ судоку: хэш SHA-256 записи, в которой неизвестные значения обозначены точкой. """
+
+    puzzle = puzzle.strip()
+    try:
+        geometry = Geometry.from_length(len(puzzle))
+    except ValueError:
+        normalized = puzzle
+    else:
+        if geometry.box > 3:
+            puzzle = puzzle.upper()
+        digits = geometry.digits
+        normalized = ''.join(value if value in digits else '.' for value in puzzle)
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+class ResultStore:
+    """
+    Хранилище результатов в файле SQLite path. Добавленные методом put результаты записываются
+    одной транзакцией, когда их накопилось commit_every или с прошлой записи прошло commit_interval
+    секунд, а также методами flush и close. Журнал WAL позволяет читать хранилище из других процессов
+    во время записи; при readonly=True хранилище открывается только для чтения.
+    """
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS results ('
+        'key TEXT PRIMARY KEY, puzzle TEXT NOT NULL, status TEXT NOT NULL, solution TEXT, '
+        'nodes INTEGER NOT NULL, elapsed REAL NOT NULL, stats TEXT, error TEXT)'
+    )
+
+    def __init__(self, path, readonly=False, commit_every=1000, commit_interval=5.0):
+        self.readonly = readonly
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self.pending = {}
+        self.committed = perf_counter()
+        if readonly:
+            self.connection = sqlite3.connect(Path(path).absolute().as_uri() + '?mode=ro', uri=True, timeout=30)
+        else:
+            self.connection = sqlite3.connect(path, timeout=30)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            with self.connection:
+                self.connection.execute(self.SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __contains__(self, puzzle):
+        return self.get(puzzle) is not None
+
+    def get(self, puzzle):
+        """ Результат StoredResult судоку, записанного строкой, либо None, если его нет в хранилище. """
+
+        return self.lookup(puzzle_key(puzzle))
+
+    def lookup(self, key):
+        """ Результат StoredResult по ключу puzzle_key либо None. """
+
+        if key in self.pending:
+            return self.pending[key]
+        row = self.connection.execute('SELECT * FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        stats = row[6]
+        return StoredResult(*row[:6], json.loads(stats) if stats is not None else None, row[7])
+
+    def count(self, status=None):
+        """ Количество записанных результатов, либо результатов с состоянием status. """
+
+        if status is None:
+            return self.connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+        return self.connection.execute('SELECT COUNT(*) FROM results WHERE status = ?', (status,)).fetchone()[0]
+
+    def put(self, result):
+        """ Добавление результата StoredResult; существующий результат с тем же ключом заменяется. """
+
+        if self.readonly:
+            raise ValueError('хранилище открыто только для чтения')
+        if result.status not in STATUSES:
+            raise ValueError(f'неизвестное состояние результата: {result.status}')
+        self.pending[result.key] = result
+        if len(self.pending) >= self.commit_every or perf_counter() - self.committed >= self.commit_interval:
+            self.flush()
+
+    def flush(self):
+        """ Запись накопленных результатов одной транзакцией. """
+
+        if self.pending:
+            rows = [(*result[:6], json.dumps(result.stats) if result.stats is not None else None, result.error)
+                    for result in self.pending.values()]
+            with self.connection:
+                self.connection.executemany('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            self.pending.clear()
+        self.committed = perf_counter()
+
+    def close(self):
+        """ Запись накопленных результатов и закрытие хранилища. """
+
+        try:
+            if not self.readonly:
+                self.flush()
+        finally:
+            self.connection.close()
+
+
+def _solve_record(key, line, stats, options):
+    """ Решение одного судоку с результатом StoredResult. Ошибки записи и вычисления сохраняются в результат. """
+
+    start = perf_counter()
+    try:
+        sudoku = Sudoku.from_string(line)
+    except ValueError as error:
+        return StoredResult(key, line, 'invalid', None, 0, 0.0, None, str(error))
+    solve_stats = SolveStats() if stats else None
+    try:
+        result = sudoku.calculate_result(stats=solve_stats, **options)
+    except ValueError as error:
+        status, solution, message = 'no_solution', None, str(error)
+    else:
+        if isinstance(result, BudgetExceeded):
+            status, solution, message = 'budget_exceeded', None, f'превышено ограничение вычисления: {result.reason}'
+        else:
+            status, solution, message = 'solved', sudoku.to_string(), None
+    elapsed = perf_counter() - start
+    return StoredResult(key, line, status, solution, sudoku.nodes, elapsed,
+                        solve_stats.as_dict() if solve_stats is not None else None, message)
+
+
+def _solve_records(chunk, stats, options):
+    """ Решение части пакета: список результатов StoredResult. """
+
+    return [_solve_record(key, line, stats, options) for key, line in chunk]
+
+
+def run_batch(puzzles, store, workers=1, chunk_size=256, retry_exceeded=False, stats=False, **options):
+    """
+    Решение потока судоку с записью результатов в хранилище store (ResultStore). Судоку, результат
+    которых уже есть в хранилище или которые уже решаются в этом пакете, пропускаются; при
+    retry_exceeded=True судоку с результатом 'budget_exceeded' решаются заново. Части по chunk_size судоку распределяются между workers процессами
+    (None - по числу ядер), при stats=True сохраняется статистика алгоритмов. Остальные аргументы
+    передаются в Sudoku.calculate_result и проверяются до начала пакета.
+
+    Возвращает количество решенных и пропущенных судоку.
+    """
+
+    validate_options(stats=SolveStats() if stats else None, **options)
+    solved = skipped = 0
+    # Ключи отправленных на решение судоку, результаты которых еще не записаны: повтор такого судоку
+    # получит результат первого
+    submitted = set()
+
+    def missing():
+        nonlocal skipped
+        for line in puzzles:
+            line = line.strip()
+            if not line:
+                continue
+            key = puzzle_key(line)
+            if key in submitted:
+                skipped += 1
+                continue
+            stored = store.lookup(key)
+            if stored is not None and not (retry_exceeded and stored.status == 'budget_exceeded'):
+                skipped += 1
+                continue
+            submitted.add(key)
+            yield key, line
+
+    def save(results):
+        nonlocal solved
+        for result in results:
+            store.put(result)
+            submitted.discard(result.key)
+            solved += 1
+
+    records = missing()
+    chunks = iter(lambda: list(islice(records, chunk_size)), [])
+    workers = workers or os.cpu_count() or 1
+    try:
+        if workers == 1:
+            for chunk in chunks:
+                save(_solve_records(chunk, stats, options))
+            return solved, skipped
+
+        with ProcessPoolExecutor(workers) as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(_solve_records, chunk, stats, options))
+                while len(pending) >= workers * 2 or pending and pending[0].done():
+                    save(pop_results(pending, ordered=False))
+            while pending:
+                save(pop_results(pending, ordered=False))
+        return solved, skipped
+    finally:
+        store.flush()
+
+
+def _export(store, file):
+    """ Вывод решений судоку файла из хранилища построчно; для судоку без решения - пустая строка. """
+
+    for line in file:
+        if line.strip():
+            result = store.get(line)
+            sys.stdout.write((result.solution or '' if result is not None else '') + '\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='sudoku_store', description='Хранилище результатов решения судоку.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run_parser = subparsers.add_parser('run', help='решение пакета с пропуском уже решенных судоку')
+    run_parser.add_argument('source', help="файл с судоку в однострочном формате, '-' - стандартный ввод")
+    run_parser.add_argument('store', help='файл хранилища')
+    run_parser.add_argument('--engine', choices=Sudoku.ENGINES, default='bitmask', help='ядро вычисления')
+    run_parser.add_argument('--workers', type=int, default=1, help='количество процессов (0 - по числу ядер)')
+    run_parser.add_argument('--chunk-size', type=int, default=256, help='количество судоку в одной части пакета')
+    run_parser.add_argument('--commit-every', type=int, default=1000, help='количество результатов в транзакции')
+    run_parser.add_argument('--deadline', type=float, help='время вычисления одного судоку в секундах')
+    run_parser.add_argument('--max-nodes', type=int, help='количество вариантов подбора одного судоку')
+    run_parser.add_argument('--stats', action='store_true', help='сохранять статистику алгоритмов')
+    run_parser.add_argument('--retry-exceeded', action='store_true',
+                            help='решить заново судоку, прерванные ограничением вычисления')
+    get_parser = subparsers.add_parser('get', help='результаты судоку из хранилища')
+    get_parser.add_argument('store', help='файл хранилища')
+    get_parser.add_argument('puzzles', nargs='+', help='судоку в однострочном формате')
+    export_parser = subparsers.add_parser('export', help='решения судоку файла в порядке строк')
+    export_parser.add_argument('store', help='файл хранилища')
+    export_parser.add_argument('source', help="файл с судоку в однострочном формате, '-' - стандартный ввод")
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        options = {'engine': args.engine}
+        if args.deadline is not None:
+            options['deadline'] = args.deadline
+        if args.max_nodes is not None:
+            options['max_nodes'] = args.max_nodes
+        with ResultStore(args.store, commit_every=args.commit_every) as store:
+            if args.source == '-':
+                solved, skipped = run_batch(sys.stdin, store, args.workers or None, args.chunk_size,
+                                            args.retry_exceeded, args.stats, **options)
+            else:
+                with open(args.source, encoding='utf-8') as file:
+                    solved, skipped = run_batch(file, store, args.workers or None, args.chunk_size,
+                                                args.retry_exceeded, args.stats, **options)
+        print(f'решено: {solved}, пропущено: {skipped}', file=sys.stderr)
+    elif args.command == 'get':
+        with ResultStore(args.store, readonly=True) as store:
+            for puzzle in args.puzzles:
+                result = store.get(puzzle)
+                print(f'{result.status} {result.solution or "-"}' if result is not None else 'missing')
+    else:
+        with ResultStore(args.store, readonly=True) as store:
+            if args.source == '-':
+                _export(store, sys.stdin)
+            else:
+                with open(args.source, encoding='utf-8') as file:
+                    _export(store, file)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())